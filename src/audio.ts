@@ -74,7 +74,8 @@ function generateAudioLocal(story: RedditStory, useDia?: boolean) {
       "--pitch",
       "1.0",
       "--emotion",
-      "neutral"
+      "neutral",
+      "--word-timings",
     ];
 
     if (useDia) {
@@ -0,0 +1,45 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "utils"))
+
+import background  # noqa: E402
+
+
+class KeyframeIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        root = Path(self.directory.name)
+        self.video = root / "background.mp4"
+        self.video.write_bytes(b"video")
+        patcher = mock.patch.object(background, "KEYFRAME_CACHE_DIR", root / "keyframes")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def index(self):
+        with mock.patch.object(background, "_probe_keyframes", return_value=[0.0, 2.0]) as probe:
+            keyframes = background.keyframe_index(self.video)
+        return keyframes, probe.call_count
+
+    def test_index_is_cached(self):
+        self.assertEqual(self.index(), ([0.0, 2.0], 1))
+        self.assertEqual(self.index(), ([0.0, 2.0], 0))
+        self.assertEqual(list(background.KEYFRAME_CACHE_DIR.glob("*.partial")), [])
+
+    def test_unreadable_index_is_rebuilt(self):
+        self.index()
+        # Left half-written, e.g. by a worker killed while writing it
+        (cache_file,) = background.KEYFRAME_CACHE_DIR.glob("*.json")
+        cache_file.write_text("[0.0, 2")
+        self.assertEqual(self.index(), ([0.0, 2.0], 1))
+        self.assertEqual(self.index(), ([0.0, 2.0], 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
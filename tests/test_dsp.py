@@ -0,0 +1,124 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import soundfile
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "utils"))
+
+import dsp  # noqa: E402
+
+SAMPLE_RATE = 24000
+
+
+def narration(seconds=3.0, seed=0):
+    """Noise with a speech-like envelope and a few peaks over full scale."""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * SAMPLE_RATE)
+    t = np.arange(n) / SAMPLE_RATE
+    envelope = 0.3 + 0.25 * np.sin(2 * np.pi * 3 * t)
+    audio = rng.standard_normal(n) * envelope * 0.5
+    audio[rng.integers(0, n, 20)] = 1.5
+    return audio.astype(np.float32)
+
+
+def in_blocks(audio, sizes=(1000, 37, 5000, 1, 2400)):
+    """Split AUDIO into blocks of uneven SIZES, cycling through them."""
+    blocks, start, i = [], 0, 0
+    while start < len(audio):
+        blocks.append(audio[start : start + sizes[i % len(sizes)]])
+        start += sizes[i % len(sizes)]
+        i += 1
+    return blocks
+
+
+def stream(reducer, audio, sizes=(1000, 37, 5000, 1, 2400)):
+    return np.concatenate([reducer.process(b) for b in in_blocks(audio, sizes)] + [reducer.flush()])
+
+
+class StreamingReducerTest(unittest.TestCase):
+    def test_compressor_matches_compress(self):
+        audio = narration()
+        np.testing.assert_array_equal(
+            stream(dsp.streaming_compressor(SAMPLE_RATE), audio), dsp.compress(audio, SAMPLE_RATE)
+        )
+
+    def test_limiter_matches_limit(self):
+        # Loud enough for the limiter to work on most blocks
+        audio = narration() * 3
+        limited = stream(dsp.streaming_limiter(SAMPLE_RATE), audio)
+        np.testing.assert_array_equal(limited, dsp.limit(audio, SAMPLE_RATE))
+        self.assertLessEqual(np.max(np.abs(limited)), 10 ** (dsp.DEFAULT_LIMIT_DBFS / 20) + 1e-6)
+
+    def test_tiny_blocks(self):
+        # A block boundary next to nearly every sample of the look-ahead window
+        audio = narration(0.5) * 3
+        np.testing.assert_array_equal(
+            stream(dsp.streaming_limiter(SAMPLE_RATE), audio, sizes=(1, 3, 7)),
+            dsp.limit(audio, SAMPLE_RATE),
+        )
+
+    def test_short_input(self):
+        # Shorter than the look-ahead: everything comes out of flush()
+        audio = narration(0.001)
+        np.testing.assert_array_equal(
+            stream(dsp.streaming_limiter(SAMPLE_RATE), audio), dsp.limit(audio, SAMPLE_RATE)
+        )
+
+
+class LoudnessMeterTest(unittest.TestCase):
+    def test_sine_reference_level(self):
+        # BS.1770: a 1 kHz sine at -20 dBFS measures -23 LUFS (mono)
+        sample_rate = 48000
+        t = np.arange(10 * sample_rate) / sample_rate
+        sine = 10 ** (-20 / 20) * np.sin(2 * np.pi * 1000 * t)
+        self.assertAlmostEqual(dsp.integrated_loudness(sine, sample_rate), -23.0, delta=0.1)
+
+    def test_chunks_match_the_whole_signal(self):
+        audio = narration()
+        meter = dsp.LoudnessMeter(SAMPLE_RATE)
+        for block in in_blocks(audio):
+            meter.feed(block)
+        self.assertAlmostEqual(meter.integrated, dsp.integrated_loudness(audio, SAMPLE_RATE), places=9)
+        self.assertEqual(meter.peak, float(np.max(np.abs(audio))))
+
+    def test_silence(self):
+        self.assertEqual(dsp.integrated_loudness(np.zeros(SAMPLE_RATE), SAMPLE_RATE), float("-inf"))
+
+
+class StreamingPostProcessorTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def check(self, **options):
+        audio = narration()
+        processor = dsp.StreamingPostProcessor(SAMPLE_RATE, self.root, **options)
+        for block in in_blocks(audio):
+            processor.feed(block)
+        output = self.root / "narration.wav"
+        processor.finish(output)
+        written, sample_rate = soundfile.read(output.as_posix(), dtype="float32")
+        self.assertEqual(sample_rate, SAMPLE_RATE)
+        # Within the 16-bit quantization of the wav file
+        np.testing.assert_allclose(
+            written, dsp.process(audio, SAMPLE_RATE, **options), rtol=0, atol=2 / 32768
+        )
+
+    def test_peak_normalization(self):
+        self.check(normalize=True)
+
+    def test_compression(self):
+        self.check(compression=True)
+
+    def test_loudness_target(self):
+        self.check(compression=True, loudness_target=-16.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
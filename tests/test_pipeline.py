@@ -0,0 +1,97 @@
+import json
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+import click
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "utils"))
+
+from pipeline import Stage, read_jobs, run_pipeline  # noqa: E402
+
+
+def write_manifest(directory: str, *entries: dict) -> Path:
+    path = Path(directory) / "jobs.jsonl"
+    path.write_text("".join(json.dumps(entry) + "\n" for entry in entries))
+    return path
+
+
+class ReadJobsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_defaults(self):
+        jobs = read_jobs(
+            write_manifest(
+                self.directory.name,
+                {"text": "Hello.", "output": "out/a.mp4", "upload": {"keywords": ["a", "b"]}},
+                {"id": "b", "audio": "b.wav", "output": "out/b.mp4"},
+            )
+        )
+        self.assertEqual([job.id for job in jobs], ["0", "b"])
+        self.assertEqual(jobs[0].audio, Path("out/a.mp3"))
+        self.assertEqual(jobs[1].audio, Path("b.wav"))
+
+    def test_rejects_invalid_upload_keywords(self):
+        manifest = write_manifest(
+            self.directory.name, {"text": "Hello.", "output": "a.mp4", "upload": {"keywords": 3}}
+        )
+        with self.assertRaises(click.UsageError):
+            read_jobs(manifest)
+
+    def test_rejects_entries_without_output(self):
+        with self.assertRaises(click.UsageError):
+            read_jobs(write_manifest(self.directory.name, {"text": "Hello."}))
+
+
+class RunPipelineTest(unittest.TestCase):
+    def jobs(self, count: int):
+        with tempfile.TemporaryDirectory() as directory:
+            return read_jobs(
+                write_manifest(
+                    directory, *({"text": str(i), "output": f"{i}.mp4"} for i in range(count))
+                )
+            )
+
+    def test_failed_job_skips_remaining_stages(self):
+        def fail_second(job):
+            if job.id == "1":
+                raise ValueError("boom")
+
+        seen = []
+        stages = [Stage("tts", fail_second), Stage("render", lambda job: seen.append(job.id), workers=2)]
+        results = {r["id"]: r for r in run_pipeline(self.jobs(3), stages)}
+        self.assertEqual(sorted(results), ["0", "1", "2"])
+        self.assertEqual(results["1"]["error"], "tts: ValueError: boom")
+        self.assertNotIn("render", results["1"]["stages"])
+        self.assertEqual(sorted(seen), ["0", "2"])
+
+    def test_queued_counts_jobs_waiting_in_the_stage_queue(self):
+        synthesized = threading.Event()
+        queued = {}
+
+        def tts(job):
+            if job.id == "2":
+                synthesized.set()
+
+        def render(job):
+            queued[job.id] = job.queued
+            if job.id == "0":
+                # Hold the render stage until the other jobs queue up behind
+                synthesized.wait(5)
+                time.sleep(0.1)
+
+        stages = [Stage("tts", tts), Stage("render", render)]
+        list(run_pipeline(self.jobs(3), stages, queue_size=4))
+        self.assertEqual(queued["1"], 1)
+        self.assertEqual(queued["2"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import sys
+import unittest
+from fractions import Fraction
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "utils"))
+
+import render  # noqa: E402
+from subtitles import SubtitleStyle, Word  # noqa: E402
+
+FONT = Path(__file__).resolve().parent.parent / "utils" / "font.ttf"
+
+
+class FrameSecondsTest(unittest.TestCase):
+    def test_never_after_the_frame(self):
+        for fps in (Fraction(30), Fraction(30000, 1001), Fraction(24000, 1001), Fraction(25)):
+            for frame in range(0, 100000, 997):
+                # As formatted on the ffmpeg command line
+                seconds = Fraction(f"{render.frame_seconds(frame, fps):.6f}")
+                self.assertLessEqual(seconds, frame / fps)
+                self.assertLess(frame / fps - seconds, Fraction(1, 1_000_000))
+
+
+class SegmentFramesTest(unittest.TestCase):
+    def test_ranges_are_whole_gops_covering_every_frame(self):
+        ranges = render.segment_frames(1000, 4, 60)
+        self.assertEqual(sum(count for _, count in ranges), 1000)
+        for (first, count), (next_first, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(first + count, next_first)
+            self.assertEqual(count % 60, 0)
+
+
+class RenderSegmentedTest(unittest.TestCase):
+    def render(self, start, fps):
+        """The commands render_segmented runs, segments first."""
+        with mock.patch.object(render.subprocess, "run") as run:
+            render.render_segmented(
+                Path("background.mp4"),
+                Path("narration.wav"),
+                Path("out.mp4"),
+                [Word(0.0, 1.0, "Hello")],
+                SubtitleStyle(font=FONT.as_posix()),
+                "tiktok",
+                start,
+                20.0,
+                (1920, 1080),
+                fps,
+                3,
+                verbose=False,
+            )
+        return [call.args[0] for call in run.call_args_list]
+
+    def test_segment_seeks_are_consecutive_frame_times(self):
+        fps = Fraction(30000, 1001)
+        segment_commands = self.render(float(12345 / fps), fps)[:-1]
+        seeks = [Fraction(cmd[cmd.index("-ss") + 1]) for cmd in segment_commands]
+        frames = [int(cmd[cmd.index("-frames:v") + 1]) for cmd in segment_commands]
+        first = 12345
+        for seek, count in zip(seeks, frames):
+            # Within a microsecond before the frame time, never after it
+            self.assertLessEqual(seek, first / fps)
+            self.assertLess(first / fps - seek, Fraction(1, 1_000_000))
+            first += count
+
+    def test_ffmpeg_never_reads_stdin(self):
+        # Under `main.py serve` stdin is the request stream
+        for cmd in self.render(10.0, Fraction(30)):
+            self.assertIn("-nostdin", cmd)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "utils"))
+
+from subtitles import SubtitleStyle, Word, render_word, wrap_text, write_ass  # noqa: E402
+
+FONT = Path(__file__).resolve().parent.parent / "utils" / "font.ttf"
+
+
+class SubtitlesTest(unittest.TestCase):
+    def setUp(self):
+        self.style = SubtitleStyle(font=FONT.as_posix(), font_size=42)
+
+    def test_wrap_text_fits_the_box(self):
+        text = "a caption that is clearly much too long for one line"
+        lines = wrap_text(text, self.style, 300)
+        self.assertGreater(len(lines), 1)
+        self.assertEqual(" ".join(lines), text)
+
+    def test_long_word_keeps_its_own_line(self):
+        self.assertEqual(wrap_text("Supercalifragilistic", self.style, 10), ["Supercalifragilistic"])
+
+    def test_render_word_wraps_to_max_width(self):
+        text = "a caption that is clearly much too long for one line"
+        _, one_line = render_word(text, self.style)
+        _, wrapped = render_word(text, self.style, 300)
+        self.assertLessEqual(wrapped.shape[1], 300)
+        self.assertGreater(wrapped.shape[0], one_line.shape[0])
+
+    def test_ass_text_has_no_override_characters(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "subtitles.ass"
+            write_ass(
+                [Word(0.0, 1.0, "{braces}\\and\\Nslashes")], path, self.style, (720, 1280), (576, 192)
+            )
+            event = path.read_text(encoding="utf-8").splitlines()[-1]
+        text = event.split("}", 1)[1]
+        self.assertEqual(text, "｛braces｝＼and＼Nslashes")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "utils"))
+
+from subtitles import Word  # noqa: E402
+from timings import read_timings, timings_path, write_timings  # noqa: E402
+
+
+class TimingsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.audio = Path(self.directory.name) / "narration.wav"
+        self.audio.write_bytes(b"first narration")
+        self.words = [Word(0.0, 0.31, "Hello,"), Word(0.31, 0.6, "world")]
+        write_timings(timings_path(self.audio), self.words, self.audio)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_matching_audio(self):
+        self.assertEqual(read_timings(timings_path(self.audio), self.audio), self.words)
+
+    def test_regenerated_audio_ignores_stale_sidecar(self):
+        self.audio.write_bytes(b"second narration")
+        self.assertIsNone(read_timings(timings_path(self.audio), self.audio))
+
+    def test_sidecar_without_audio_hash_is_ignored(self):
+        path = timings_path(self.audio)
+        path.write_text(json.dumps({"version": 1, "source": "kokoro", "words": []}))
+        self.assertIsNone(read_timings(path, self.audio))
+
+
+if __name__ == "__main__":
+    unittest.main()
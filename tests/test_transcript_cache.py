@@ -0,0 +1,79 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "utils"))
+
+from background import HASH_SAMPLES  # noqa: E402
+from cache import HASH_BLOCK_SIZE  # noqa: E402
+from subtitles import Word  # noqa: E402
+from transcript_cache import Segment, TranscriptCache, TranscriptInfo  # noqa: E402
+
+
+class TranscriptCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name)
+        self.cache = TranscriptCache(self.root / "cache")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def key(self, audio: Path) -> str:
+        return self.cache.key(audio, "tiny", "int8", None, 30, True)
+
+    def test_round_trip(self):
+        audio = self.root / "narration.wav"
+        audio.write_bytes(b"narration")
+        segments = [Segment(0.0, 1.0, "Hello", (Word(0.0, 1.0, "Hello"),))]
+        info = TranscriptInfo("en", 0.99, 1.0)
+        self.cache.put(self.key(audio), segments, info)
+        self.assertEqual(self.cache.get(self.key(audio)), (segments, info))
+
+    def test_truncated_entry_is_a_miss(self):
+        audio = self.root / "narration.wav"
+        audio.write_bytes(b"narration")
+        key = self.key(audio)
+        self.cache.put(key, [Segment(0.0, 1.0, "Hello")], TranscriptInfo("en", 0.99, 1.0))
+        path = self.cache._path(key)
+        path.write_bytes(path.read_bytes()[:20])
+        self.assertIsNone(self.cache.get(key))
+        self.assertFalse(path.exists())
+
+    def test_concurrent_puts_of_one_narration(self):
+        audio = self.root / "narration.wav"
+        audio.write_bytes(b"narration")
+        key = self.key(audio)
+        info = TranscriptInfo("en", 0.99, 1.0)
+        replace = os.replace
+
+        def other_writer_first(src, dst):
+            # Another process stores the same transcript while this one writes
+            with mock.patch("cache.os.replace", replace):
+                self.cache.put(key, [Segment(0.0, 1.0, "Other")], info)
+            replace(src, dst)
+
+        with mock.patch("cache.os.replace", side_effect=other_writer_first):
+            self.cache.put(key, [Segment(0.0, 1.0, "Hello")], info)
+        segments, _ = self.cache.get(key)
+        self.assertEqual(segments[0].text, "Hello")
+        self.assertEqual(list(self.cache.directory.glob("*/*.partial")), [])
+
+    def test_long_narrations_differing_between_sampled_blocks(self):
+        # Larger than content_hash reads in full, same size and same sampled blocks
+        size = (HASH_SAMPLES + 1) * HASH_BLOCK_SIZE
+        first = self.root / "first.wav"
+        second = self.root / "second.wav"
+        data = bytearray(size)
+        first.write_bytes(data)
+        # Just past the first block, before the second one starts
+        data[HASH_BLOCK_SIZE + 1] = 1
+        second.write_bytes(data)
+        self.assertNotEqual(self.key(first), self.key(second))
+
+
+if __name__ == "__main__":
+    unittest.main()
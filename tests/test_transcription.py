@@ -0,0 +1,68 @@
+import importlib.util
+import inspect
+import sys
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "utils"))
+
+import transcription  # noqa: E402
+import vad  # noqa: E402
+
+HAS_FASTER_WHISPER = importlib.util.find_spec("faster_whisper") is not None
+
+
+class RecordingPipeline:
+    """Checks transcribe() calls against BatchedInferencePipeline and cuts chunks like it."""
+
+    def __init__(self):
+        self.chunks = None
+
+    def transcribe(self, audio, **options):
+        from faster_whisper import BatchedInferencePipeline
+        from faster_whisper.vad import collect_chunks
+
+        inspect.signature(BatchedInferencePipeline.transcribe).bind(self, audio, **options)
+        self.chunks, _ = collect_chunks(audio, options["clip_timestamps"])
+        info = SimpleNamespace(language="en", language_probability=1.0, duration=len(audio) / vad.SAMPLE_RATE)
+        return iter([]), info
+
+
+@unittest.skipUnless(HAS_FASTER_WHISPER, "faster-whisper is not installed")
+class ClipTimestampsTest(unittest.TestCase):
+    def setUp(self):
+        # 3 s of tone, 2 s of silence, 3 s of tone
+        t = np.arange(3 * vad.SAMPLE_RATE) / vad.SAMPLE_RATE
+        tone = (0.5 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+        self.samples = np.concatenate([tone, np.zeros(2 * vad.SAMPLE_RATE, np.float32), tone])
+
+    def transcribe(self, method):
+        pipeline = RecordingPipeline()
+        with mock.patch.object(transcription, "get_whisper_pipeline", return_value=pipeline), mock.patch(
+            "faster_whisper.decode_audio", return_value=self.samples
+        ):
+            segments, _ = transcription.transcribe_audio(
+                Path("narration.wav"), "tiny", chunk_length=4, vad=method, use_cache=False
+            )
+            list(segments)
+        return pipeline.chunks
+
+    def test_energy_chunks_are_sample_slices(self):
+        chunks = self.transcribe("energy")
+        self.assertEqual(len(chunks), 2)
+        for chunk in chunks:
+            # Each tone plus up to the speech padding on both sides
+            self.assertGreaterEqual(len(chunk), 3 * vad.SAMPLE_RATE)
+            self.assertLessEqual(len(chunk), 4 * vad.SAMPLE_RATE)
+
+    def test_off_chunks_cover_the_audio(self):
+        chunks = self.transcribe("off")
+        self.assertEqual([len(c) for c in chunks], [4 * vad.SAMPLE_RATE, 4 * vad.SAMPLE_RATE])
+
+
+if __name__ == "__main__":
+    unittest.main()
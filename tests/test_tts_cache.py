@@ -0,0 +1,64 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "utils"))
+
+from subtitles import Word  # noqa: E402
+from tts_cache import TTSCache  # noqa: E402
+
+
+class TTSCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = TTSCache(Path(self.directory.name), max_bytes=1)
+        self.key = self.cache.key("Hello there.", "af_sarah", 0.9, "kokoro")
+        self.cache.put(self.key, np.ones(100, dtype=np.float32), [Word(0.0, 0.5, "Hello")])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        audio, words = self.cache.get(self.key)
+        self.assertEqual(len(audio), 100)
+        self.assertEqual(words, [Word(0.0, 0.5, "Hello")])
+
+    def test_entry_evicted_while_reading_is_still_returned(self):
+        # Another process evicts the entry between the read and the LRU touch
+        with mock.patch("tts_cache.os.utime", side_effect=FileNotFoundError):
+            hit = self.cache.get(self.key)
+        self.assertIsNotNone(hit)
+
+    def test_corrupt_entry_is_a_miss(self):
+        path = self.cache._path(self.key)
+        path.write_bytes(path.read_bytes()[:50])
+        self.assertIsNone(self.cache.get(self.key))
+        self.assertFalse(path.exists())
+
+    def test_concurrent_puts_of_one_sentence(self):
+        replace = os.replace
+
+        def other_writer_first(src, dst):
+            # Another process stores the same sentence while this one writes
+            with mock.patch("tts_cache.os.replace", replace):
+                self.cache.put(self.key, np.zeros(50, dtype=np.float32), [])
+            replace(src, dst)
+
+        with mock.patch("tts_cache.os.replace", side_effect=other_writer_first):
+            self.cache.put(self.key, np.ones(100, dtype=np.float32), [Word(0.0, 0.5, "Hello")])
+        audio, _ = self.cache.get(self.key)
+        self.assertEqual(len(audio), 100)
+        self.assertEqual(list(self.cache.directory.glob("*/*.partial.npz")), [])
+
+    def test_evict_enforces_the_size_limit(self):
+        self.cache.evict()
+        self.assertIsNone(self.cache.get(self.key))
+
+
+if __name__ == "__main__":
+    unittest.main()
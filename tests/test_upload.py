@@ -0,0 +1,197 @@
+import asyncio
+import importlib.util
+import json
+import sys
+import tempfile
+import time
+import unittest
+from argparse import Namespace
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "utils"))
+
+import upload  # noqa: E402
+
+HAS_GOOGLE_CLIENT = importlib.util.find_spec("googleapiclient") is not None
+
+SESSION_URI = "https://upload.example.com/session/1"
+NEW_SESSION_URI = "https://upload.example.com/session/2"
+
+
+class FixedPolicy(upload.RetryPolicy):
+    """Backs off for exactly BASE_DELAY seconds."""
+
+    def delay(self, attempt):
+        return self.base_delay
+
+
+def make_policies(delay=0.0):
+    return {
+        "server": FixedPolicy(2, delay, delay),
+        "network": FixedPolicy(2, delay, delay),
+        "rate_limit": FixedPolicy(2, delay, delay, pause_all=True),
+        "session_expired": FixedPolicy(1, 0, 0),
+    }
+
+
+class RecordingReporter(upload.ProgressReporter):
+    def __init__(self, file):
+        super().__init__(file)
+        self.events = []
+
+    def emit(self, event, message=None, **fields):
+        self.events.append((event, fields))
+
+    def retries(self):
+        return [fields["error_class"] for event, fields in self.events if event == "retry"]
+
+
+def opened(uri=SESSION_URI):
+    return ({"status": "200", "location": uri}, "")
+
+
+def done(video_id="video-1"):
+    return ({"status": "200"}, json.dumps({"id": video_id}))
+
+
+def error(status, reason="backendError"):
+    body = {"error": {"code": status, "errors": [{"reason": reason}]}}
+    return ({"status": str(status)}, json.dumps(body))
+
+
+@unittest.skipUnless(HAS_GOOGLE_CLIENT, "google-api-python-client is not installed")
+class ResumableUploadTest(unittest.TestCase):
+    def setUp(self):
+        from googleapiclient.discovery import build_from_document
+        from googleapiclient.discovery_cache import get_static_doc
+        from googleapiclient.http import HttpMockSequence
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name)
+        self.video = self.root / "video.mp4"
+        self.video.write_bytes(b"\0" * 1000)
+        self.session_path = self.root / "session.json"
+        document = get_static_doc(upload.YOUTUBE_API_SERVICE_NAME, upload.YOUTUBE_API_VERSION)
+        self.youtube = build_from_document(document, http=HttpMockSequence([]))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def upload(self, responses, scheduler=None, deadline=None):
+        """Upload the test video over a transport answering with RESPONSES."""
+        from googleapiclient.http import HttpMockSequence
+
+        class Transport(HttpMockSequence):
+            # Entries that are exceptions are raised instead of answered
+            def request(self, uri, method="GET", *args, **kwargs):
+                if isinstance(self._iterable[0], Exception):
+                    self.request_sequence.append((uri, method, None, None))
+                    raise self._iterable.pop(0)
+                return super().request(uri, method, *args, **kwargs)
+
+        options = Namespace(
+            file=str(self.video),
+            title="Title",
+            description="",
+            category="22",
+            keywords="",
+            privacyStatus="private",
+            chunk_size=upload.DEFAULT_CHUNK_SIZE_MB,
+        )
+        request, _ = upload.build_upload_request(self.youtube, options)
+        self.reporter = RecordingReporter(options.file)
+        self.transport = Transport(list(responses))
+        self.scheduler = scheduler or upload.BackoffScheduler(make_policies())
+        result = asyncio.run(
+            upload.resumable_upload(
+                request,
+                self.reporter,
+                self.session_path,
+                connection=self.transport,
+                scheduler=self.scheduler,
+                deadline=deadline,
+            )
+        )
+        self.assertEqual(self.transport._iterable, [], "responses left unused")
+        return result
+
+    def requests(self):
+        return [(method, uri) for uri, method, _, _ in self.transport.request_sequence]
+
+    def test_upload(self):
+        result = self.upload([opened(), done()])
+        self.assertTrue(result.ok)
+        self.assertEqual(result.video_id, "video-1")
+        self.assertFalse(self.session_path.exists())
+
+    def test_server_errors_are_retried(self):
+        result = self.upload([error(503), opened(), done()])
+        self.assertTrue(result.ok)
+        self.assertEqual(self.reporter.retries(), ["server"])
+
+    def test_server_errors_give_up_after_max_retries(self):
+        result = self.upload([error(500), error(502), error(503)])
+        self.assertEqual(result.error_class, "server")
+        self.assertEqual(result.attempts, 3)
+
+    def test_network_errors_are_retried(self):
+        result = self.upload([ConnectionResetError("reset"), opened(), done()])
+        self.assertTrue(result.ok)
+        self.assertEqual(self.reporter.retries(), ["network"])
+
+    def test_rate_limit_pauses_every_upload(self):
+        scheduler = upload.BackoffScheduler(make_policies(0.05))
+        started = time.monotonic()
+        result = self.upload([error(403, "rateLimitExceeded"), opened(), done()], scheduler)
+        self.assertTrue(result.ok)
+        self.assertEqual(self.reporter.retries(), ["rate_limit"])
+        # The pause is on the shared scheduler, not a sleep of this upload
+        self.assertGreaterEqual(scheduler._resume_at, started + 0.05)
+
+    def test_quota_stops_every_upload(self):
+        result = self.upload([error(403, "quotaExceeded")])
+        self.assertEqual(result.error_class, "quota")
+        self.assertTrue(self.scheduler.quota_exhausted)
+
+        # Later uploads on the same scheduler send nothing
+        result = self.upload([], self.scheduler)
+        self.assertEqual(result.error_class, "quota")
+        self.assertEqual(self.requests(), [])
+
+    def test_session_is_saved_before_the_first_chunk_completes(self):
+        result = self.upload([opened(), error(400, "invalidMetadata")])
+        self.assertFalse(result.ok)
+        self.assertEqual(upload.load_session(self.session_path), SESSION_URI)
+
+    def test_interrupted_session_is_resumed(self):
+        result = self.upload([opened(), ConnectionResetError("reset"), ({"status": "308"}, ""), done()])
+        self.assertTrue(result.ok)
+        # The retry asks the same session for its offset instead of opening a new one
+        self.assertEqual([method for method, _ in self.requests()], ["POST", "PUT", "PUT", "PUT"])
+        self.assertEqual({uri for _, uri in self.requests()[1:]}, {SESSION_URI})
+
+    def test_expired_session_is_restarted(self):
+        for status in (404, 410):
+            with self.subTest(status=status):
+                upload.save_session(self.session_path, SESSION_URI)
+                result = self.upload([error(status), opened(NEW_SESSION_URI), done()])
+                self.assertTrue(result.ok)
+                self.assertEqual(self.reporter.retries(), ["session_expired"])
+                self.assertEqual(
+                    [uri for _, uri in self.requests()][::2], [SESSION_URI, NEW_SESSION_URI]
+                )
+
+    def test_deadline(self):
+        result = self.upload([], deadline=time.monotonic() - 1)
+        self.assertEqual(result.error_class, "deadline")
+        self.assertEqual(result.attempts, 0)
+
+    def test_retry_past_the_deadline(self):
+        scheduler = upload.BackoffScheduler(make_policies(60))
+        result = self.upload([error(503)], scheduler, deadline=time.monotonic() + 30)
+        self.assertEqual(result.error_class, "deadline")
+        self.assertEqual(result.attempts, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import io
+import json
+import sys
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+
+import click
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "utils"))
+
+from worker import handle_request  # noqa: E402
+
+
+@click.group()
+def group():
+    pass
+
+
+@group.command()
+def audio():
+    pass
+
+
+@group.command()
+def editor():
+    raise click.ClickException("Video duration is less than audio duration.")
+
+
+@group.command()
+@click.option("--fail", is_flag=True)
+@click.pass_context
+def transcribe(ctx, fail):
+    # Like the real command: logs on stderr, the transcript on stdout
+    results = sys.stdout
+    with redirect_stdout(sys.stderr):
+        click.echo("Transcribing...")
+        click.echo('{"start": 0.0, "end": 1.0, "text": "Hello"}', file=results)
+    if fail:
+        ctx.exit(2)
+
+
+def request(command, *args, stderr=None):
+    with redirect_stderr(stderr or io.StringIO()):
+        return handle_request(
+            group, json.dumps({"id": "1", "command": command, "args": list(args)})
+        )
+
+
+class HandleRequestTest(unittest.TestCase):
+    def test_success(self):
+        response = request("audio")
+        self.assertTrue(response["ok"])
+        self.assertIsNone(response["error"])
+        self.assertEqual(response["output"], "")
+
+    def test_stdout_is_returned(self):
+        stderr = io.StringIO()
+        response = request("transcribe", stderr=stderr)
+        self.assertTrue(response["ok"])
+        self.assertEqual(response["output"], '{"start": 0.0, "end": 1.0, "text": "Hello"}\n')
+        self.assertEqual(stderr.getvalue(), "Transcribing...\n")
+
+    def test_click_exception_is_a_failure(self):
+        response = request("editor")
+        self.assertFalse(response["ok"])
+        self.assertEqual(response["error"], "Video duration is less than audio duration.")
+
+    def test_non_zero_exit_is_a_failure(self):
+        response = request("transcribe", "--fail")
+        self.assertFalse(response["ok"])
+        self.assertEqual(response["error"], "Exited with status 2")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+"""
+Forced alignment of a known script to its narration.
+
+When the text of the narration is known, aligning it to the audio with a CTC
+model (torchaudio's MMS_FA) is cheaper than free transcription with beam
+search, and subtitles use the script's own spelling.
+
+Requires torchaudio (`pip install torchaudio`).
+"""
+
+import re
+from pathlib import Path
+
+from models import get_alignment_model
+from subtitles import Word
+
+SAMPLE_RATE = 16000
+# Emissions are computed in windows to keep attention memory bounded
+WINDOW_SECONDS = 30
+
+
+def split_words(text: str) -> list[str]:
+    """Split TEXT into the words displayed as subtitles."""
+    text = text.replace("...", ". ").replace("—", " ").replace("–", " ")
+    return text.split()
+
+
+def normalize_word(word: str) -> str:
+    """Reduce WORD to the characters the alignment model knows (a-z and ')."""
+    word = word.lower().replace("’", "'")
+    return re.sub(r"[^a-z']", "", word).strip("'")
+
+
+def _emissions(model, waveform, device: str):
+    import torch
+
+    window = WINDOW_SECONDS * SAMPLE_RATE
+    chunks = []
+    with torch.inference_mode():
+        for start in range(0, waveform.size(1), window):
+            chunk = waveform[:, start : start + window].to(device)
+            emission, _ = model(chunk)
+            chunks.append(emission[0].cpu())
+    return torch.cat(chunks)
+
+
+def align_words(audio: Path, text: str, device: str = "cpu") -> list[Word]:
+    """
+    Align the words of TEXT to AUDIO.
+
+    Words without alignable characters (numbers, symbols) are placed between
+    their aligned neighbours.
+
+    Args:
+        audio: Narration audio file
+        text: The script read in AUDIO
+        device: Device to run the alignment model on
+
+    Returns:
+        The words of TEXT with timestamps
+    """
+    import torch
+    from faster_whisper import decode_audio
+
+    words = split_words(text)
+    if not words:
+        return []
+
+    model, tokenizer, aligner = get_alignment_model(device)
+    samples = decode_audio(audio.as_posix(), sampling_rate=SAMPLE_RATE)
+    waveform = torch.from_numpy(samples).unsqueeze(0)
+    emission = _emissions(model, waveform, device)
+    seconds_per_frame = waveform.size(1) / emission.size(0) / SAMPLE_RATE
+
+    normalized = [normalize_word(word) for word in words]
+    alignable = [i for i, word in enumerate(normalized) if word]
+    timings: list[tuple[float, float] | None] = [None] * len(words)
+    if alignable:
+        spans = aligner(emission, tokenizer([normalized[i] for i in alignable]))
+        for i, word_spans in zip(alignable, spans):
+            timings[i] = (
+                word_spans[0].start * seconds_per_frame,
+                word_spans[-1].end * seconds_per_frame,
+            )
+
+    duration = waveform.size(1) / SAMPLE_RATE
+    return [Word(start, end, word) for word, (start, end) in zip(words, _fill_gaps(timings, duration))]
+
+
+def _fill_gaps(
+    timings: list[tuple[float, float] | None], duration: float
+) -> list[tuple[float, float]]:
+    # Give unaligned words the gap between the previous and next aligned word,
+    # shared evenly between consecutive unaligned words
+    filled = list(timings)
+    i = 0
+    while i < len(filled):
+        if filled[i] is not None:
+            i += 1
+            continue
+        j = i
+        while j < len(filled) and filled[j] is None:
+            j += 1
+        gap_start = filled[i - 1][1] if i > 0 else 0.0
+        gap_end = filled[j][0] if j < len(filled) else duration
+        step = max(gap_end - gap_start, 0.0) / (j - i)
+        for k in range(i, j):
+            offset = gap_start + (k - i) * step
+            filled[k] = (offset, offset + step)
+        i = j
+    return filled
@@ -5,21 +5,11 @@ This module provides high-quality audio generation using the Dia model from Nari
 It's used as an alternative to Kokoro TTS when more natural, dialogue-style speech is needed.
 """
 
-import soundfile as sf
 from pathlib import Path
 from typing import Optional
 
-# Lazy load Dia model to avoid startup cost
-_model = None
-
-
-def _get_model():
-    """Lazy load the Dia model."""
-    global _model
-    if _model is None:
-        from dia.model import Dia
-        _model = Dia.from_pretrained("nari-labs/Dia-1.6B")
-    return _model
+import dsp
+from synthesis import generate_dia_cached
 
 
 def generate_audio(
@@ -41,35 +31,13 @@ def generate_audio(
         Path to the generated audio file
     """
     output_path = Path(output_path)
-    model = _get_model()
     
-    # Generate audio
-    audio_data = model.generate(text)
+    # Generate audio (the model is only loaded when the text is not cached)
+    audio_data = generate_dia_cached(text)
     
-    # Apply normalization if requested
-    if normalize:
-        try:
-            from pydub import AudioSegment
-            from pydub.effects import normalize as normalize_audio
-            import io
-            import numpy as np
-            
-            # Convert to pydub AudioSegment
-            audio_bytes = io.BytesIO()
-            sf.write(audio_bytes, audio_data, sample_rate, format='WAV')
-            audio_bytes.seek(0)
-            audio_seg = AudioSegment.from_wav(audio_bytes)
-            
-            # Normalize
-            audio_seg = normalize_audio(audio_seg)
-            
-            # Export to final output
-            audio_seg.export(str(output_path), format=output_path.suffix[1:])
-        except ImportError:
-            # Fallback to direct save without normalization
-            sf.write(str(output_path), audio_data, sample_rate)
-    else:
-        sf.write(str(output_path), audio_data, sample_rate)
+    # Apply normalization if requested, in memory, and write the file once
+    audio_data = dsp.process(audio_data, sample_rate, normalize=normalize)
+    dsp.write_audio(output_path, audio_data, sample_rate)
     
     return output_path
 
@@ -0,0 +1,249 @@
+"""
+Background video helpers for the editor.
+
+Background footage is often hours long, so the editor never decodes it from the
+start. Instead the random start is snapped to a keyframe (found through a
+per-file keyframe index cached on disk) and the slice is read with an input
+seek, optionally stream-copied to a small temporary file before any decode.
+
+Backgrounds reused across many jobs can also be transcoded once into a proxy
+that is already cropped and scaled for an output format (`main.py prepare`),
+which the editor then picks up automatically.
+"""
+
+import hashlib
+import json
+import subprocess
+from bisect import bisect_right
+from pathlib import Path
+from random import randint
+from typing import Optional
+
+from cache import CACHE_DIR, HASH_BLOCK_SIZE, replacing
+from render import FORMAT_SIZES, background_filter, media_duration, probe, video_size
+
+KEYFRAME_CACHE_DIR = CACHE_DIR / "keyframes"
+PROXY_DIR = CACHE_DIR / "proxies"
+
+# Number of evenly spaced blocks (of HASH_BLOCK_SIZE) hashed to identify a
+# background's content
+HASH_SAMPLES = 16
+
+# Proxy encoding settings; part of the proxy key so changing them rebuilds proxies
+PROXY_ENCODING = {
+    "codec": "libx264",
+    "preset": "medium",
+    "crf": 18,
+    # Short GOP keeps keyframe seeks into the proxy cheap
+    "gop": 60,
+}
+
+
+def file_fingerprint(path: Path) -> str:
+    """Cheap identity of PATH based on its location, size and modification time."""
+    stat = path.stat()
+    key = f"{path.resolve().as_posix()}:{stat.st_size}:{stat.st_mtime_ns}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def _probe_keyframes(video: Path) -> list[float]:
+    # Reading packets only demuxes the file, nothing is decoded
+    result = subprocess.run(
+        [
+            "ffprobe",
+            "-v", "error",
+            "-select_streams", "v:0",
+            "-show_entries", "packet=pts_time,flags",
+            "-of", "csv=print_section=0",
+            video.as_posix(),
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    keyframes = []
+    for line in result.stdout.splitlines():
+        pts_time, _, flags = line.partition(",")
+        if "K" in flags and pts_time not in ("", "N/A"):
+            keyframes.append(float(pts_time))
+    return sorted(keyframes)
+
+
+def keyframe_index(video: Path) -> list[float]:
+    """
+    Return the sorted keyframe timestamps of VIDEO.
+
+    The index is built once per file and cached under media/cache/keyframes,
+    keyed by the file's path, size and modification time.
+    """
+    cache_file = KEYFRAME_CACHE_DIR / f"{file_fingerprint(video)}.json"
+    try:
+        return json.loads(cache_file.read_text())
+    except (FileNotFoundError, ValueError):
+        pass  # Not indexed yet, or an unreadable index: build it again
+
+    keyframes = _probe_keyframes(video)
+    # Render workers may index the same background at once
+    with replacing(cache_file) as partial:
+        partial.write_text(json.dumps(keyframes))
+    return keyframes
+
+
+def snap_to_keyframe(keyframes: list[float], t: float) -> float:
+    """Return the last keyframe at or before T (or T itself if there is none)."""
+    i = bisect_right(keyframes, t) - 1
+    return keyframes[i] if i >= 0 else t
+
+
+def extract_slice(video: Path, start: float, duration: float, output: Path) -> Path:
+    """
+    Stream-copy DURATION seconds of VIDEO from START into OUTPUT.
+
+    START should be a keyframe so the copy begins exactly there without
+    re-encoding. The slice keeps only the video stream.
+    """
+    subprocess.run(
+        [
+            "ffmpeg",
+            "-y",
+            "-hide_banner",
+            "-nostdin",
+            "-loglevel", "error",
+            "-ss", f"{start:.3f}",
+            "-i", video.as_posix(),
+            "-t", f"{duration:.3f}",
+            "-map", "0:v:0",
+            "-c", "copy",
+            "-avoid_negative_ts", "make_zero",
+            output.as_posix(),
+        ],
+        check=True,
+    )
+    return output
+
+
+def content_hash(path: Path) -> str:
+    """
+    Hash the content of PATH.
+
+    Only the size and HASH_SAMPLES evenly spaced blocks are hashed, which
+    identifies multi-GB footage without reading all of it.
+    """
+    size = path.stat().st_size
+    digest = hashlib.sha1(str(size).encode("utf-8"))
+    with open(path, "rb") as f:
+        if size <= HASH_SAMPLES * HASH_BLOCK_SIZE:
+            digest.update(f.read())
+        else:
+            step = (size - HASH_BLOCK_SIZE) // (HASH_SAMPLES - 1)
+            for i in range(HASH_SAMPLES):
+                f.seek(i * step)
+                digest.update(f.read(HASH_BLOCK_SIZE))
+    return digest.hexdigest()
+
+
+def proxy_params(format: str, source_size: tuple[int, int]) -> dict:
+    """Parameters a proxy of FORMAT is built with."""
+    chain, size = background_filter(format, source_size)
+    return {"format": format, "size": list(size), "filter": chain, **PROXY_ENCODING}
+
+
+def _proxy_paths(source_hash: str, params: dict) -> tuple[Path, Path]:
+    params_hash = hashlib.sha1(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+    stem = f"{source_hash[:16]}-{params_hash[:8]}"
+    return PROXY_DIR / f"{stem}.mp4", PROXY_DIR / f"{stem}.json"
+
+
+def find_proxy(video: Path, format: str, source_size: tuple[int, int]) -> Optional[Path]:
+    """Return the prepared proxy of VIDEO for FORMAT, if there is a valid one."""
+    if format not in FORMAT_SIZES:
+        return None
+
+    source_hash = content_hash(video)
+    params = proxy_params(format, source_size)
+    proxy, manifest = _proxy_paths(source_hash, params)
+    if not (proxy.exists() and manifest.exists()):
+        return None
+
+    entry = json.loads(manifest.read_text())
+    if entry.get("content_hash") != source_hash or entry.get("params") != params:
+        return None
+    return proxy
+
+
+def prepare_proxy(
+    video: Path, format: str, source_size: tuple[int, int], force: bool = False
+) -> Path:
+    """
+    Transcode VIDEO once into a proxy already cropped and scaled for FORMAT.
+
+    The proxy is written to media/cache/proxies with a JSON manifest holding
+    the source content hash and the build parameters.
+    """
+    source_hash = content_hash(video)
+    params = proxy_params(format, source_size)
+    proxy, manifest = _proxy_paths(source_hash, params)
+    if not force and find_proxy(video, format, source_size) == proxy:
+        return proxy
+
+    PROXY_DIR.mkdir(parents=True, exist_ok=True)
+    partial = proxy.with_suffix(".partial.mp4")
+    subprocess.run(
+        [
+            "ffmpeg",
+            "-y",
+            "-hide_banner",
+            "-nostdin",
+            "-loglevel", "error",
+            "-stats",
+            "-i", video.as_posix(),
+            "-vf", params["filter"],
+            "-an",
+            "-c:v", params["codec"],
+            "-preset", params["preset"],
+            "-crf", str(params["crf"]),
+            "-g", str(params["gop"]),
+            "-pix_fmt", "yuv420p",
+            partial.as_posix(),
+        ],
+        check=True,
+    )
+    partial.replace(proxy)
+    manifest.write_text(
+        json.dumps(
+            {"source": video.resolve().as_posix(), "content_hash": source_hash, "params": params},
+            indent=2,
+        )
+    )
+    return proxy
+
+
+def choose_background(
+    video: Path, duration: float, format: str, use_proxy: bool = True
+) -> tuple[Path, dict, float]:
+    """
+    Pick the background of a render of DURATION seconds in FORMAT.
+
+    With USE_PROXY, a proxy of VIDEO prepared for FORMAT is used when there is
+    one. The start is random, snapped to a keyframe so seeking never decodes
+    from an earlier point.
+
+    Returns:
+        Tuple of (background video, its probe info, start in seconds)
+
+    Raises:
+        ValueError: If the background is shorter than DURATION
+    """
+    video_info = probe(video)
+    if use_proxy:
+        proxy = find_proxy(video, format, video_size(video_info))
+        if proxy:
+            video = proxy
+            video_info = probe(video)
+
+    video_duration = media_duration(video_info)
+    if video_duration < duration:
+        raise ValueError("Video duration is less than audio duration.")
+    # trunk-ignore(bandit/B311)
+    start = randint(0, int(video_duration) - int(duration))
+    return video, video_info, snap_to_keyframe(keyframe_index(video), start)
@@ -0,0 +1,52 @@
+"""
+Helpers shared by the on-disk caches under media/cache.
+
+Several processes (render workers, `main.py serve`, batch jobs) may fill the
+same cache at once, so entries are written to a temporary file of their own
+and moved into place in one step: readers never see a half-written entry.
+"""
+
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+CACHE_DIR = Path(__file__).parent.parent / "media" / "cache"
+
+# Bytes read at a time when hashing a file
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_hash(path: Path) -> str:
+    """
+    Hash the whole content of PATH.
+
+    For files such as narrations that are small enough to read in full and
+    may differ only outside the blocks background.content_hash samples.
+    """
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        while block := f.read(HASH_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@contextmanager
+def replacing(path: Path, suffix: str = ".partial") -> Iterator[Path]:
+    """
+    Yield a temporary path to write PATH's new content to.
+
+    The file is moved over PATH when the block completes and deleted if it
+    raises. Its name, ending in SUFFIX, is unique to this writer.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, partial = tempfile.mkstemp(dir=path.parent, prefix=f"{path.name}.", suffix=suffix)
+    os.close(fd)
+    try:
+        yield Path(partial)
+        os.replace(partial, path)
+    except BaseException:
+        Path(partial).unlink(missing_ok=True)
+        raise
@@ -0,0 +1,401 @@
+"""
+Audio post-processing on numpy arrays.
+
+Vectorized replacements for pydub's `normalize` and `compress_dynamic_range`
+that work on the float32 samples produced by the TTS engines, so narrations
+are processed in memory and written to disk once.
+
+Includes peak and loudness (LUFS, ITU-R BS.1770) normalization, a compressor
+and a look-ahead limiter, plus a streaming variant (StreamingPostProcessor)
+whose memory use does not grow with the length of the narration.
+"""
+
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+import soundfile
+from scipy.ndimage import maximum_filter1d
+from scipy.signal import lfilter
+
+# pydub's normalize() leaves 0.1 dB of headroom
+DEFAULT_PEAK_DBFS = -0.1
+DEFAULT_LIMIT_DBFS = -1.0
+
+# BS.1770 gating
+BLOCK_SECONDS = 0.4
+HOP_SECONDS = 0.1
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+
+
+def _k_weighting(sample_rate: int) -> list[tuple[np.ndarray, np.ndarray]]:
+    # BS.1770 K-weighting: a high shelf followed by a high pass, computed for
+    # any sample rate from their analog prototypes
+    def biquad(kind: str, gain_db: float, q: float, fc: float):
+        a_gain = 10 ** (gain_db / 40)
+        w0 = 2 * np.pi * fc / sample_rate
+        alpha = np.sin(w0) / (2 * q)
+        cos_w0 = np.cos(w0)
+        if kind == "high_shelf":
+            sqrt_a = 2 * np.sqrt(a_gain) * alpha
+            b = [
+                a_gain * ((a_gain + 1) + (a_gain - 1) * cos_w0 + sqrt_a),
+                -2 * a_gain * ((a_gain - 1) + (a_gain + 1) * cos_w0),
+                a_gain * ((a_gain + 1) + (a_gain - 1) * cos_w0 - sqrt_a),
+            ]
+            a = [
+                (a_gain + 1) - (a_gain - 1) * cos_w0 + sqrt_a,
+                2 * ((a_gain - 1) - (a_gain + 1) * cos_w0),
+                (a_gain + 1) - (a_gain - 1) * cos_w0 - sqrt_a,
+            ]
+        else:
+            b = [(1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2]
+            a = [1 + alpha, -2 * cos_w0, 1 - alpha]
+        return np.array(b) / a[0], np.array(a) / a[0]
+
+    return [
+        biquad("high_shelf", 4.0, 1 / np.sqrt(2), 1500.0),
+        biquad("high_pass", 0.0, 0.5, 38.0),
+    ]
+
+
+class LoudnessMeter:
+    """
+    Integrated loudness (LUFS) and peak of mono audio fed in chunks.
+
+    Only the energy of each 100 ms hop is kept, so memory stays small however
+    long the audio is.
+    """
+
+    def __init__(self, sample_rate: int):
+        self.sample_rate = sample_rate
+        self.hop = max(int(round(HOP_SECONDS * sample_rate)), 1)
+        self.peak = 0.0
+        self._filters = _k_weighting(sample_rate)
+        self._states = [np.zeros(2) for _ in self._filters]
+        self._pending = np.zeros(0)
+        self._hop_energy: list[float] = []
+
+    def feed(self, chunk: np.ndarray):
+        """Add the next CHUNK of samples."""
+        chunk = np.asarray(chunk, dtype=np.float64).reshape(-1)
+        if chunk.size == 0:
+            return
+        self.peak = max(self.peak, float(np.max(np.abs(chunk))))
+
+        weighted = chunk
+        for i, (b, a) in enumerate(self._filters):
+            weighted, self._states[i] = lfilter(b, a, weighted, zi=self._states[i])
+
+        squared = np.concatenate([self._pending, weighted * weighted])
+        hops = len(squared) // self.hop
+        if hops:
+            self._hop_energy.extend(squared[: hops * self.hop].reshape(hops, self.hop).sum(axis=1))
+        self._pending = squared[hops * self.hop :]
+
+    @property
+    def integrated(self) -> float:
+        """Gated integrated loudness in LUFS (-inf for silence)."""
+        hops_per_block = int(round(BLOCK_SECONDS / HOP_SECONDS))
+        hop_energy = np.array(self._hop_energy)
+        if len(hop_energy) < hops_per_block:
+            # Shorter than one gating block: measure everything as one block
+            count = len(hop_energy) * self.hop + len(self._pending)
+            total = hop_energy.sum() + self._pending.sum()
+            blocks = np.array([total / count]) if count else np.zeros(0)
+        else:
+            sums = np.convolve(hop_energy, np.ones(hops_per_block), mode="valid")
+            blocks = sums / (hops_per_block * self.hop)
+
+        blocks = blocks[blocks > 0]
+        if blocks.size == 0:
+            return float("-inf")
+        levels = -0.691 + 10 * np.log10(blocks)
+        blocks, levels = blocks[levels > ABSOLUTE_GATE_LUFS], levels[levels > ABSOLUTE_GATE_LUFS]
+        if blocks.size == 0:
+            return float("-inf")
+        relative_gate = -0.691 + 10 * np.log10(blocks.mean()) + RELATIVE_GATE_LU
+        gated = blocks[levels > relative_gate]
+        return float(-0.691 + 10 * np.log10(gated.mean()))
+
+
+def integrated_loudness(audio: np.ndarray, sample_rate: int) -> float:
+    """Integrated loudness of AUDIO in LUFS."""
+    meter = LoudnessMeter(sample_rate)
+    meter.feed(audio)
+    return meter.integrated
+
+
+def peak_gain(peak: float, target_dbfs: float = DEFAULT_PEAK_DBFS) -> float:
+    """Linear gain bringing PEAK to TARGET_DBFS."""
+    if peak <= 0:
+        return 1.0
+    return 10 ** (target_dbfs / 20) / peak
+
+
+def loudness_gain(loudness: float, target_lufs: float) -> float:
+    """Linear gain bringing LOUDNESS to TARGET_LUFS."""
+    if not np.isfinite(loudness):
+        return 1.0
+    return 10 ** ((target_lufs - loudness) / 20)
+
+
+def _smooth_reduction(
+    reduction_db: np.ndarray, sample_rate: int, attack_ms: float, release_ms: float
+) -> np.ndarray:
+    # Hold each reduction over the attack window (look-ahead, so the gain is
+    # already down when a peak arrives), then release with a one-pole filter.
+    # Never reduce less than the held value, so peaks are always caught.
+    attack = max(int(sample_rate * attack_ms / 1000), 1)
+    held = maximum_filter1d(reduction_db, size=2 * attack + 1)
+    coefficient = np.exp(-1.0 / max(sample_rate * release_ms / 1000, 1.0))
+    released = lfilter([1 - coefficient], [1, -coefficient], held)
+    return np.maximum(released, held)
+
+
+def _level_db(audio: np.ndarray) -> np.ndarray:
+    return 20 * np.log10(np.maximum(np.abs(audio), 1e-9))
+
+
+def _compressor_reduction(threshold_db: float, ratio: float) -> Callable[[np.ndarray], np.ndarray]:
+    def reduction(audio: np.ndarray) -> np.ndarray:
+        return np.maximum(_level_db(audio) - threshold_db, 0.0) * (1 - 1 / ratio)
+
+    return reduction
+
+
+def _limiter_reduction(ceiling_db: float) -> Callable[[np.ndarray], np.ndarray]:
+    def reduction(audio: np.ndarray) -> np.ndarray:
+        return np.maximum(_level_db(audio) - ceiling_db, 0.0)
+
+    return reduction
+
+
+def compress(
+    audio: np.ndarray,
+    sample_rate: int,
+    threshold_db: float = -20.0,
+    ratio: float = 4.0,
+    attack_ms: float = 5.0,
+    release_ms: float = 50.0,
+) -> np.ndarray:
+    """Downward compressor with the same defaults as pydub's compress_dynamic_range."""
+    reduction_db = _smooth_reduction(
+        _compressor_reduction(threshold_db, ratio)(audio), sample_rate, attack_ms, release_ms
+    )
+    return (audio * 10 ** (-reduction_db / 20)).astype(np.float32)
+
+
+def limit(
+    audio: np.ndarray,
+    sample_rate: int,
+    ceiling_db: float = DEFAULT_LIMIT_DBFS,
+    lookahead_ms: float = 5.0,
+    release_ms: float = 50.0,
+) -> np.ndarray:
+    """Look-ahead brickwall limiter keeping every sample under CEILING_DB."""
+    over_db = _limiter_reduction(ceiling_db)(audio)
+    if not over_db.any():
+        return audio.astype(np.float32)
+    reduction_db = _smooth_reduction(over_db, sample_rate, lookahead_ms, release_ms)
+    return (audio * 10 ** (-reduction_db / 20)).astype(np.float32)
+
+
+class StreamingReducer:
+    """
+    Block-by-block version of compress() and limit().
+
+    Keeps the attack window of look-ahead and context plus the release filter
+    state between blocks, so the output matches processing the whole signal
+    at once. Output lags input by the attack window; call flush() at the end.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        reduction: Callable[[np.ndarray], np.ndarray],
+        attack_ms: float,
+        release_ms: float,
+    ):
+        self.reduction = reduction
+        self.attack = max(int(sample_rate * attack_ms / 1000), 1)
+        self.coefficient = np.exp(-1.0 / max(sample_rate * release_ms / 1000, 1.0))
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._context = 0  # Samples at the start of the buffer already output
+        self._state = np.zeros(1)
+
+    def _emit(self, end: int) -> np.ndarray:
+        held = maximum_filter1d(self.reduction(self._buffer), size=2 * self.attack + 1)
+        held = held[self._context : end]
+        released, self._state = lfilter(
+            [1 - self.coefficient], [1, -self.coefficient], held, zi=self._state
+        )
+        reduction_db = np.maximum(released, held)
+        return (self._buffer[self._context : end] * 10 ** (-reduction_db / 20)).astype(np.float32)
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """Feed BLOCK and return the samples that are ready."""
+        self._buffer = np.concatenate([self._buffer, np.asarray(block, dtype=np.float32)])
+        # Every output sample needs `attack` samples of look-ahead
+        end = len(self._buffer) - self.attack
+        if end <= self._context:
+            return np.zeros(0, dtype=np.float32)
+        output = self._emit(end)
+        start = max(end - self.attack, 0)
+        self._buffer = self._buffer[start:]
+        self._context = end - start
+        return output
+
+    def flush(self) -> np.ndarray:
+        """Return the remaining samples once the input has ended."""
+        if len(self._buffer) <= self._context:
+            return np.zeros(0, dtype=np.float32)
+        output = self._emit(len(self._buffer))
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._context = 0
+        return output
+
+
+def streaming_compressor(
+    sample_rate: int,
+    threshold_db: float = -20.0,
+    ratio: float = 4.0,
+    attack_ms: float = 5.0,
+    release_ms: float = 50.0,
+) -> StreamingReducer:
+    """Streaming equivalent of compress()."""
+    return StreamingReducer(
+        sample_rate, _compressor_reduction(threshold_db, ratio), attack_ms, release_ms
+    )
+
+
+def streaming_limiter(
+    sample_rate: int,
+    ceiling_db: float = DEFAULT_LIMIT_DBFS,
+    lookahead_ms: float = 5.0,
+    release_ms: float = 50.0,
+) -> StreamingReducer:
+    """Streaming equivalent of limit()."""
+    return StreamingReducer(sample_rate, _limiter_reduction(ceiling_db), lookahead_ms, release_ms)
+
+
+def process(
+    audio: np.ndarray,
+    sample_rate: int,
+    normalize: bool = True,
+    compression: bool = False,
+    loudness_target: float | None = None,
+) -> np.ndarray:
+    """
+    Post-process AUDIO in memory.
+
+    Compression runs first, then either loudness normalization to
+    LOUDNESS_TARGET (followed by the limiter, since the gain may push peaks
+    over full scale) or peak normalization.
+    """
+    audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+    if compression:
+        audio = compress(audio, sample_rate)
+    if loudness_target is not None:
+        audio = audio * loudness_gain(integrated_loudness(audio, sample_rate), loudness_target)
+        audio = limit(audio, sample_rate)
+    elif normalize:
+        audio = audio * peak_gain(float(np.max(np.abs(audio), initial=0.0)))
+    return audio.astype(np.float32)
+
+
+def write_audio(path: Path, audio: np.ndarray, sample_rate: int):
+    """
+    Write AUDIO to PATH in the format given by its extension.
+
+    libsndfile handles wav, flac, ogg and mp3; other formats are exported
+    through pydub (ffmpeg) when it is available.
+    """
+    path = Path(path)
+    if path.suffix[1:].upper() in soundfile.available_formats():
+        soundfile.write(path.as_posix(), audio, sample_rate)
+        return
+
+    from pydub import AudioSegment
+
+    samples = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+    segment = AudioSegment(
+        samples.tobytes(), frame_rate=sample_rate, sample_width=2, channels=1
+    )
+    segment.export(path.as_posix(), format=path.suffix[1:])
+
+
+class StreamingPostProcessor:
+    """
+    Two-pass post-processing with flat memory use.
+
+    The first pass (feed) compresses chunks as they are produced, appends them
+    to a raw float32 file in WORKDIR and accumulates peak and loudness. The
+    second pass (finish) memory-maps that file and writes the output block by
+    block with the normalization gain and, for loudness targets, the limiter.
+    """
+
+    BLOCK_SECONDS = 1.0
+
+    def __init__(
+        self,
+        sample_rate: int,
+        workdir: Path,
+        normalize: bool = True,
+        compression: bool = False,
+        loudness_target: Optional[float] = None,
+    ):
+        self.sample_rate = sample_rate
+        self.normalize = normalize
+        self.loudness_target = loudness_target
+        self.meter = LoudnessMeter(sample_rate)
+        self.compressor = streaming_compressor(sample_rate) if compression else None
+        self._raw_path = Path(workdir) / "narration.f32"
+        self._raw = open(self._raw_path, "wb")
+
+    def _append(self, samples: np.ndarray):
+        self.meter.feed(samples)
+        samples.astype(np.float32).tofile(self._raw)
+
+    def feed(self, chunk: np.ndarray):
+        """First pass: add the next CHUNK of samples."""
+        chunk = np.asarray(chunk, dtype=np.float32).reshape(-1)
+        self._append(self.compressor.process(chunk) if self.compressor else chunk)
+
+    def gain(self) -> float:
+        """Normalization gain derived from the first pass."""
+        if self.loudness_target is not None:
+            return loudness_gain(self.meter.integrated, self.loudness_target)
+        if self.normalize:
+            return peak_gain(self.meter.peak)
+        return 1.0
+
+    def finish(self, output: Path):
+        """Second pass: write the normalized audio to OUTPUT."""
+        if self.compressor:
+            self._append(self.compressor.flush())
+        self._raw.close()
+
+        gain = self.gain()
+        limiter = streaming_limiter(self.sample_rate) if self.loudness_target is not None else None
+        samples = (
+            np.memmap(self._raw_path, dtype=np.float32, mode="r")
+            if self._raw_path.stat().st_size
+            else np.zeros(0, dtype=np.float32)
+        )
+
+        output = Path(output)
+        if output.suffix[1:].upper() not in soundfile.available_formats():
+            # Formats libsndfile cannot write go through pydub in one piece
+            audio = samples * gain
+            write_audio(output, limit(audio, self.sample_rate) if limiter else audio, self.sample_rate)
+            return
+
+        block = max(int(self.BLOCK_SECONDS * self.sample_rate), 1)
+        with soundfile.SoundFile(output.as_posix(), "w", self.sample_rate, 1) as out:
+            for start in range(0, len(samples), block):
+                audio = np.asarray(samples[start : start + block]) * gain
+                out.write(limiter.process(audio) if limiter else audio.astype(np.float32))
+            if limiter:
+                out.write(limiter.flush())
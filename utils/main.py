@@ -1,62 +1,60 @@
 import click
 import moviepy
-import datetime
-import soundfile
+import json
+import shutil
+import sys
 import tempfile
 import numpy as np
 
+from contextlib import nullcontext, redirect_stdout
+from functools import partial
 from pathlib import Path
-from random import randint
-from kokoro import KPipeline
-from faster_whisper import WhisperModel, BatchedInferencePipeline
-
-# Optional pydub for audio normalization
-try:
-    from pydub import AudioSegment
-    from pydub.effects import normalize as normalize_audio_levels, compress_dynamic_range
-    PYDUB_AVAILABLE = True
-except ImportError:
-    PYDUB_AVAILABLE = False
 
-BASE_DIR = Path(__file__).parent.parent
-
-
-def float_srt(float_timestamp):
-    dt = datetime.datetime.fromtimestamp(float_timestamp)
-    dt = dt.replace(hour=dt.hour - 16)
-    return dt.strftime("%H:%M:%S,%f")[:-3]
-
-
-def get_crop_coordinates(video_width, video_height):
-    """
-    Calculates crop coordinates for converting a 16:9 video to a 9:16 video.
-    It crops off the left and right parts while retaining the full vertical resolution.
-
-    Parameters:
-        video_width (float or int): The original video width.
-        video_height (float or int): The original video height.
-
-    Returns:
-        dict: A dictionary containing:
-              - x1: The left x-coordinate of the crop.
-              - y1: The top y-coordinate (always 0).
-              - x2: The right x-coordinate of the crop.
-              - y2: The bottom y-coordinate (equal to video_height).
-              - crop_width: The width of the cropped area.
-              - crop_height: The height of the cropped area.
-    """
-    # Calculate the required crop width for a 9:16 aspect ratio using the full height.
-    crop_width = video_height * (9 / 16)
-
-    # Center the crop horizontally by calculating x1 and x2.
-    x1 = (video_width - crop_width) / 2
-    x2 = x1 + crop_width
-
-    # Use the full height.
-    y1 = 0
-    y2 = video_height
+from align import align_words
+from background import choose_background, extract_slice, prepare_proxy
+from models import registry
+from pipeline import (
+    DEFAULT_QUEUE_SIZE,
+    Stage,
+    align_job,
+    read_jobs,
+    render_job,
+    run_pipeline,
+    synthesize_job,
+    upload_stage,
+)
+from render import (
+    DEFAULT_PROFILE,
+    ENCODER_PROFILES,
+    FORMAT_SIZES,
+    OUTPUT_FFMPEG_PARAMS,
+    encoder_threads,
+    format_output,
+    frame_rate,
+    get_crop_coordinates,
+    media_duration,
+    probe,
+    render_editor,
+    render_multi_format,
+    render_segmented,
+    resolve_profile,
+    subtitle_box,
+    video_size,
+)
+from subtitles import SubtitleRenderer, SubtitleStyle
+from synthesis import read_manifest, synthesize_batch, synthesize_dia, synthesize_kokoro
+from transcript_cache import Segment
+from transcription import (
+    DEFAULT_CHUNK_LENGTH,
+    OUTPUT_FORMATS,
+    VAD_METHODS,
+    format_segments,
+    resolve_subtitle_words,
+    transcribe_audio,
+)
+from worker import serve_socket, serve_stdio
 
-    return {"x1": x1, "y1": y1, "x2": x2, "y2": y2, "w": crop_width, "h": video_height}
+BASE_DIR = Path(__file__).parent.parent
 
 
 @click.group()
@@ -65,7 +63,7 @@ def cli():
 
 
 @cli.command()
-@click.argument("text")
+@click.argument("text", required=False)
 @click.option(
     "-s", "--speed", default=0.9, type=float, help="Speech speed (0.5-2.0).", show_default=True
 )
@@ -84,7 +82,6 @@ def cli():
 @click.option(
     "-o",
     "--output",
-    required=True,
     help="Audio output file path.",
     type=Path,
     show_default=True,
@@ -99,9 +96,40 @@ def cli():
 @click.option(
     "--compression", is_flag=True, default=False, help="Apply dynamic range compression."
 )
+@click.option(
+    "--word-timings",
+    is_flag=True,
+    default=False,
+    help="Write Kokoro word timings next to OUTPUT (<name>.words.json) for the editor.",
+)
+@click.option(
+    "--batch",
+    default=None,
+    type=Path,
+    help="JSON-lines manifest of scripts to synthesize in one run.",
+)
+@click.option(
+    "--workers",
+    default=1,
+    type=click.IntRange(min=1),
+    help="Synthesize sentence chunks in parallel across this many processes (Kokoro only).",
+    show_default=True,
+)
+@click.option(
+    "--cache/--no-cache",
+    default=True,
+    help="Reuse previously synthesized sentences from the TTS cache. Kokoro scripts are then synthesized sentence by sentence, which can change prosody across sentence boundaries; --no-cache synthesizes whole scripts.",
+    show_default=True,
+)
+@click.option(
+    "--loudness-target",
+    default=None,
+    type=float,
+    help="Normalize to this integrated loudness in LUFS (e.g. -14) instead of peak level.",
+)
 def audio(
-    text: str,
-    output: Path,
+    text: str | None,
+    output: Path | None,
     voice: str,
     speed: float,
     pitch: float,
@@ -111,8 +139,43 @@ def audio(
     use_dia: bool,
     normalize: bool,
     compression: bool,
+    word_timings: bool,
+    batch: Path | None,
+    workers: int,
+    cache: bool,
+    loudness_target: float | None,
 ):
-    """Convert TEXT to audio and save to OUTPUT. Supports Kokoro TTS and Dia."""
+    """Convert TEXT to audio and save to OUTPUT. Supports Kokoro TTS and Dia.
+
+    With --batch MANIFEST, synthesizes every entry of a JSON-lines manifest
+    ({"id", "text", "output", "voice", "speed"}) in one process and prints one
+    JSON result line per entry.
+    """
+    if batch:
+        entries = read_manifest(batch)
+        # Keep logs away from the JSON result stream
+        results = sys.stdout
+        with redirect_stdout(sys.stderr):
+            for result in synthesize_batch(
+                entries,
+                voice,
+                speed,
+                use_dia=use_dia,
+                verbose=verbose,
+                normalize=normalize,
+                compression=compression,
+                word_timings=word_timings,
+                workers=workers,
+                use_cache=cache,
+                loudness_target=loudness_target,
+            ):
+                results.write(json.dumps(result) + "\n")
+                results.flush()
+        return
+
+    if text is None or output is None:
+        raise click.UsageError("TEXT and --output are required unless --batch is given.")
+
     if verbose:
         click.echo(f"Generating audio for text: '{text}...'")
         if use_dia:
@@ -126,94 +189,34 @@ def audio(
     try:
         if use_dia:
             try:
-                from dia.model import Dia  # Conditional import
-
-                if verbose:
-                    click.echo("Loading Dia model...")
-                model = Dia.from_pretrained(
-                    "nari-labs/Dia-1.6B"
-                )  # Or your preferred model
-                if verbose:
-                    click.echo("Generating audio with Dia...")
-                dia_output = model.generate(text)
-                # Using 44100 sample rate as in your example.
-                soundfile.write(output.as_posix(), dia_output, 44100)
-                if verbose:
-                    click.echo(f"Successfully saved Dia audio to {output}")
-            except ImportError:
-                click.echo(
-                    "Error: Dia model selected, but 'dia-model' package is not installed.",
-                    err=True,
-                )
-                click.echo(
-                    "Please install it by running: pip install dia-model", err=True
-                )
-                return  # Exit if Dia is required but not available
+                synthesize_dia(text, output, use_cache=cache, verbose=verbose)
+            except ImportError as e:
+                # Exit if Dia is required but not available
+                raise click.ClickException(
+                    "Dia model selected, but 'dia-model' package is not installed.\n"
+                    "Please install it by running: pip install dia-model"
+                ) from e
             except Exception as e:
-                click.echo(f"Error during Dia audio generation: {e}", err=True)
-                return
+                raise click.ClickException(f"Error during Dia audio generation: {e}") from e
         else:
-            # Enhanced Kokoro TTS configuration for better audio quality
-            pipeline = KPipeline(
-                lang_code="a",
-                device="cpu",  # Use CPU for consistency
-                # half_precision=False,  # Full precision for better quality
+            synthesize_kokoro(
+                text,
+                output,
+                voice=voice,
+                speed=speed,
+                normalize=normalize,
+                compression=compression,
+                word_timings=word_timings,
+                workers=workers,
+                use_cache=cache,
+                loudness_target=loudness_target,
+                verbose=verbose,
             )
-
-            # Pre-process text for better TTS output
-            processed_text = text.replace("...", ". ")  # Convert ellipsis to pauses
-            processed_text = processed_text.replace("—", ", ")  # Convert em-dashes to commas
-            processed_text = processed_text.replace("–", ", ")  # Convert en-dashes to commas
-
-            # Generate to temp file first for post-processing
-            temp_output = output if not (normalize or compression) else Path(tempfile.mktemp(suffix=".wav"))
-            
-            with soundfile.SoundFile(
-                temp_output.as_posix(), "w", 24000, 1
-            ) as out:  # Kokoro default SR
-                for _, _, audio_chunk in pipeline(
-                    processed_text,
-                    voice=voice,
-                    speed=speed,
-                    # pitch=pitch,
-                    # emotion=emotion,
-                ):
-                    out.write(audio_chunk)
-            
-            # Apply audio post-processing if enabled
-            if (normalize or compression) and PYDUB_AVAILABLE:
-                if verbose:
-                    click.echo("Applying audio post-processing...")
-                
-                audio_seg = AudioSegment.from_file(temp_output.as_posix())
-                
-                if normalize:
-                    audio_seg = normalize_audio_levels(audio_seg)
-                    if verbose:
-                        click.echo("  ✓ Audio normalized")
-                
-                if compression:
-                    audio_seg = compress_dynamic_range(audio_seg, threshold=-20.0, ratio=4.0)
-                    if verbose:
-                        click.echo("  ✓ Dynamic range compression applied")
-                
-                # Export to final output
-                audio_seg.export(output.as_posix(), format=output.suffix[1:])
-                
-                # Clean up temp file
-                if temp_output != output:
-                    temp_output.unlink(missing_ok=True)
-            elif (normalize or compression) and not PYDUB_AVAILABLE:
-                click.echo("Warning: pydub not available, skipping audio normalization. Install with: pip install pydub", err=True)
-                if temp_output != output:
-                    import shutil
-                    shutil.move(temp_output.as_posix(), output.as_posix())
-            
-            if verbose:
-                click.echo(f"Successfully saved Kokoro TTS audio to {output}")
+    except click.ClickException:
+        raise
     except Exception as e:
         # General exception for Kokoro or other issues outside Dia-specific block
-        click.echo(f"Error generating audio: {e}", err=True)
+        raise click.ClickException(f"Error generating audio: {e}") from e
 
 
 @cli.command()
@@ -262,6 +265,11 @@ def audio(
     help="Output video format (e.g., tiktok, youtube).",
     show_default=True,
 )
+@click.option(
+    "--formats",
+    default=None,
+    help="Comma-separated formats (e.g. 'tiktok,youtube') rendered together from one decode (ffmpeg engine). Outputs are named OUTPUT_<format>. Overrides --format.",
+)
 @click.option(
     "--font",
     default=BASE_DIR / "utils" / "font.ttf",
@@ -295,6 +303,26 @@ def audio(
     help="Batch size for editor transcription.",
     show_default=True,
 )
+@click.option(
+    "--editor_chunk_length",
+    default=DEFAULT_CHUNK_LENGTH,
+    type=click.IntRange(min=1, max=30),
+    help="Maximum length of the speech chunks batched for editor transcription (seconds).",
+    show_default=True,
+)
+@click.option(
+    "--editor_vad",
+    default="silero",
+    type=click.Choice(VAD_METHODS),
+    help="Speech detection used to chunk the audio and skip silence for editor transcription.",
+    show_default=True,
+)
+@click.option(
+    "--editor_min_silence_ms",
+    default=None,
+    type=click.IntRange(min=0),
+    help="Shortest silence separating speech chunks for editor transcription. Defaults to the VAD's own.",
+)
 # --- Subtitle Styling Options ---
 @click.option(
     "--font_size",
@@ -341,7 +369,65 @@ def audio(
 @click.option(
     "--video_bitrate",
     default=None,
-    help="Video bitrate for output file (e.g., '5000k').",
+    help="Video bitrate for output file (e.g., '5000k'). Overrides the profile's rate control.",
+)
+@click.option(
+    "--profile",
+    default=DEFAULT_PROFILE,
+    type=click.Choice([*ENCODER_PROFILES, "auto"]),
+    help="Encoder profile. 'auto' picks one from --queue_depth.",
+    show_default=True,
+)
+@click.option(
+    "--queue_depth",
+    default=0,
+    type=click.IntRange(min=0),
+    envvar="RENDER_QUEUE_DEPTH",
+    help="Renders waiting behind this one, used by '--profile auto'.",
+    show_default=True,
+)
+@click.option(
+    "--timings",
+    default=None,
+    type=Path,
+    help="Word timings written by 'audio --word-timings'. Defaults to the sidecar next to AUDIO; Whisper is skipped when it exists.",
+)
+@click.option(
+    "--text",
+    default=None,
+    help="Known script of AUDIO. Subtitles are force-aligned to it instead of transcribed.",
+)
+@click.option(
+    "--engine",
+    default="moviepy",
+    type=click.Choice(["moviepy", "ffmpeg"]),
+    help="Render engine. 'ffmpeg' renders in a single filtergraph without decoding frames in Python.",
+    show_default=True,
+)
+@click.option(
+    "--segments",
+    default=1,
+    type=click.IntRange(min=1),
+    help="Split the timeline into this many GOP-aligned segments rendered in parallel (ffmpeg engine).",
+    show_default=True,
+)
+@click.option(
+    "--background_slice/--no-background_slice",
+    default=True,
+    help="Stream-copy the background slice to a temporary file before decoding (moviepy engine).",
+    show_default=True,
+)
+@click.option(
+    "--use_proxy/--no-use_proxy",
+    default=True,
+    help="Use a background proxy prepared with the 'prepare' command when one exists.",
+    show_default=True,
+)
+@click.option(
+    "--cache/--no-cache",
+    default=True,
+    help="Reuse an earlier transcription of AUDIO with the same Whisper settings.",
+    show_default=True,
 )
 # --- General Options ---
 @click.option("--verbose", is_flag=True, default=True, help="Enable verbose output.")
@@ -352,11 +438,15 @@ def editor(
     screenshot: Path | None,
     output: Path,
     format: str,
+    formats: str | None,
     font: Path,
     editor_model_size: str,
     editor_device: str,
     editor_compute_type: str,
     editor_batch_size: int,
+    editor_chunk_length: int,
+    editor_vad: str,
+    editor_min_silence_ms: int | None,
     font_size: int,
     font_color: str,
     stroke_color: str,
@@ -365,6 +455,15 @@ def editor(
     video_codec: str,
     audio_codec: str,
     video_bitrate: str | None,
+    profile: str,
+    queue_depth: int,
+    timings: Path | None,
+    text: str | None,
+    engine: str,
+    segments: int,
+    background_slice: bool,
+    use_proxy: bool,
+    cache: bool,
     verbose: bool,
 ):
     """Edit VIDEO by adding AUDIO, generating and overlaying SUBTITLEs, and saving to OUTPUT."""
@@ -393,51 +492,150 @@ def editor(
         click.echo(
             f"  Video Bitrate: {'Default' if video_bitrate is None else video_bitrate}"
         )
+        click.echo(f"  Engine: {engine}")
+        if segments > 1:
+            click.echo(f"  Segments: {segments}")
 
-    try:
-        # Initialize Whisper model for transcription using new options
+    if segments > 1 and engine != "ffmpeg":
+        raise click.UsageError("--segments requires --engine ffmpeg.")
+
+    format_list = [f.strip() for f in formats.split(",") if f.strip()] if formats else [format]
+    format_list = list(dict.fromkeys(format_list))  # Drop duplicates, keep order
+    if len(format_list) > 1:
+        if engine != "ffmpeg":
+            raise click.UsageError("--formats requires --engine ffmpeg.")
+        if segments > 1:
+            raise click.UsageError("--formats cannot be combined with --segments.")
         if verbose:
-            click.echo("Initializing Whisper model...")
-        model = WhisperModel(
-            editor_model_size, device=editor_device, compute_type=editor_compute_type
+            click.echo(f"  Formats: {', '.join(format_list)}")
+    format = format_list[0]
+
+    encoder_profile = resolve_profile(profile, queue_depth)
+    threads = encoder_threads(segments * len(format_list))
+    if verbose:
+        click.echo(
+            f"  Encoder Profile: {encoder_profile.name} (preset {encoder_profile.preset}, {threads} threads)"
         )
-        batched_model = BatchedInferencePipeline(model=model)
 
-        if verbose:
-            click.echo("Loading audio and video clips...")
-        audio_clip = moviepy.AudioFileClip(audio.as_posix())
-        video_clip = moviepy.VideoFileClip(video.as_posix())
+    slice_dir = None
+    try:
+        # Reject a background that is too short before any transcription
+        audio_duration = media_duration(probe(audio))
+        # A proxy is already cropped to one format, so it cannot feed several
+        use_proxy = use_proxy and len(format_list) == 1
+        try:
+            source, video_info, random_start = choose_background(
+                video, audio_duration, format, use_proxy
+            )
+        except ValueError as e:
+            raise click.ClickException(str(e)) from e
+        if source != video:
+            if verbose:
+                click.echo(f"Using prepared background proxy: {source}")
+            video = source
 
-        # Ensure video duration matches audio duration, starting from a random point
-        if video_clip.duration < audio_clip.duration:
-            click.echo("Error: Video duration is less than audio duration.", err=True)
-            return
-        # trunk-ignore(bandit/B311)
-        random_start = randint(0, int(video_clip.duration) - int(audio_clip.duration))
-        video_clip = (
-            video_clip.subclipped(random_start)
-            .with_duration(audio_clip.duration)
-            .with_audio(audio_clip)
+        # Prefer the word timings written by the audio command, then alignment
+        # of the known script, and only transcribe as a last resort
+        subtitle_words = resolve_subtitle_words(
+            audio,
+            editor_model_size,
+            editor_device,
+            editor_compute_type,
+            editor_batch_size,
+            timings=timings,
+            text=text,
+            verbose=verbose,
+            use_cache=cache,
+            chunk_length=editor_chunk_length,
+            vad=editor_vad,
+            min_silence_ms=editor_min_silence_ms,
         )
+
         if verbose:
-            click.echo(
-                f"Video clipped to {audio_clip.duration:.2f}s starting at {random_start:.2f}s."
+            click.echo(f"Collected {len(subtitle_words)} subtitle words.")
+
+        subtitle_style = SubtitleStyle(
+            font=font.as_posix(),
+            font_size=font_size,
+            color=font_color,
+            stroke_color=stroke_color,
+            stroke_width=stroke_width,
+        )
+        has_screenshot = bool(screenshot and screenshot.exists())
+
+        if engine == "ffmpeg":
+            if verbose:
+                click.echo(
+                    f"Rendering {audio_duration:.2f}s starting at {random_start:.2f}s with ffmpeg to {output}..."
+                )
+            render_args = (
+                video,
+                audio,
+                output,
+                subtitle_words,
+                subtitle_style,
+                format,
+                random_start,
+                audio_duration,
+                video_size(video_info),
             )
+            encode = dict(
+                subtitle_position=subtitle_position,
+                screenshot=screenshot if has_screenshot else None,
+                verbose=verbose,
+                video_codec=video_codec,
+                audio_codec=audio_codec,
+                profile=encoder_profile,
+                video_bitrate=video_bitrate,
+            )
+            if len(format_list) > 1:
+                outputs = {f: format_output(output, f) for f in format_list}
+                render_multi_format(
+                    video,
+                    audio,
+                    outputs,
+                    subtitle_words,
+                    subtitle_style,
+                    random_start,
+                    audio_duration,
+                    video_size(video_info),
+                    threads=threads,
+                    **encode,
+                )
+                if verbose:
+                    for path in outputs.values():
+                        click.echo(f"  ✓ {path}")
+            elif segments > 1:
+                render_segmented(*render_args, frame_rate(video_info), segments, **encode)
+            else:
+                render_editor(*render_args, threads=threads, **encode)
+            if verbose:
+                click.echo("Video editing complete.")
+            return
 
         if verbose:
-            click.echo(f"Transcribing audio file: {audio}...")
-        subtitles_data, info = batched_model.transcribe(
-            audio.as_posix(),
-            batch_size=editor_batch_size,  # Use new option
-            word_timestamps=True,
-        )
+            click.echo("Loading audio and video clips...")
+        audio_clip = moviepy.AudioFileClip(audio.as_posix())
+        if background_slice:
+            slice_dir = Path(tempfile.mkdtemp(prefix="background-"))
+            background = extract_slice(
+                video,
+                random_start,
+                # Keep a little slack so the slice never ends before the audio
+                audio_clip.duration + 1,
+                slice_dir / f"slice{video.suffix}",
+            )
+            video_clip = moviepy.VideoFileClip(background.as_posix())
+        else:
+            video_clip = moviepy.VideoFileClip(video.as_posix()).subclipped(random_start)
+
+        video_clip = video_clip.with_duration(audio_clip.duration).with_audio(audio_clip)
         if verbose:
             click.echo(
-                f"Transcription complete. Language: {info.language} (Prob: {info.language_probability:.2f}), Duration: {info.duration:.2f}s"
+                f"Video clipped to {audio_clip.duration:.2f}s starting at {random_start:.2f}s."
             )
-            click.echo("Generating subtitle TextClips...")
 
-        if format == "tiktok":
+        if format == "tiktok" and (video_clip.w, video_clip.h) != FORMAT_SIZES["tiktok"]:
             if verbose:
                 click.echo("Formatting for TikTok (9:16 aspect ratio)...")
             crop = get_crop_coordinates(video_clip.w, video_clip.h)
@@ -451,7 +649,7 @@ def editor(
 
         # Load screenshot overlay if provided
         screenshot_clip = None
-        if screenshot and screenshot.exists():
+        if has_screenshot:
             if verbose:
                 click.echo(f"Loading screenshot overlay: {screenshot}")
             screenshot_clip = moviepy.ImageClip(screenshot.as_posix())
@@ -467,54 +665,6 @@ def editor(
             if verbose:
                 click.echo(f"Screenshot dimensions: {screenshot_clip.w}x{screenshot_clip.h}")
 
-        subtitle_texts = []
-        # Optionally write generated subtitles to the specified subtitle file path
-        # Consider adding an option like --save_srt to control this explicitly
-        # if save_srt:
-        #     with open(subtitle.as_posix(), "w") as sub_file:
-        #         index = 0
-        #         for sub in subtitles_data:
-        #              for word in sub.words:
-        #                   srt_line = f"{index+1}\n{float_srt(word.start)} --> {float_srt(word.end)}\n{word.word.strip()}\n\n"
-        #                   sub_file.write(srt_line)
-        #                   index += 1
-
-        for sub in subtitles_data:
-            for word in (sub.words or []):
-                # Create TextClip for video overlay using new style options
-                txt_clip = moviepy.TextClip(
-                    font=font.as_posix(),
-                    size=(  # Keep dynamic sizing for now, could be made configurable
-                        int((video_clip.h * (9 / 16)) * 0.8),
-                        int(video_clip.h * 0.15),
-                    ),
-                    text=word.word.strip(),
-                    font_size=font_size,
-                    color=font_color,
-                    method="caption",
-                    stroke_color=stroke_color,
-                    stroke_width=stroke_width,
-                )
-
-                # Adjust subtitle position based on screenshot presence
-                # if screenshot_clip and subtitle_position == "center":
-                #     # Position subtitles below the screenshot
-                #     subtitle_y = (video_clip.h / 2) + (screenshot_clip.h / 2) + 20
-                #     txt_clip = txt_clip.with_position(("center", subtitle_y))
-                # else:
-                #     txt_clip = txt_clip.with_position(subtitle_position)
-
-                txt_clip = txt_clip.with_position(subtitle_position)
-
-                txt_clip = (
-                    txt_clip.with_start(word.start)
-                    .with_end(word.end)
-                )
-                subtitle_texts.append(txt_clip)
-
-        if verbose:
-            click.echo(f"Generated {len(subtitle_texts)} subtitle clips.")
-
         if verbose:
             click.echo("Compositing video and subtitles...")
 
@@ -522,32 +672,32 @@ def editor(
         clips = [video_clip]
         if screenshot_clip:
             clips.append(screenshot_clip)
-        clips.extend(subtitle_texts)
 
-        final_clip = moviepy.CompositeVideoClip(clips)
+        final_clip = moviepy.CompositeVideoClip(clips) if len(clips) > 1 else video_clip
+
+        # Draw subtitles on top of everything from cached word bitmaps,
+        # instead of compositing one TextClip per word
+        subtitle_renderer = SubtitleRenderer(
+            subtitle_words,
+            subtitle_style,
+            box_size=subtitle_box(video_clip.h),
+            position=subtitle_position,
+        )
+        final_clip = final_clip.transform(subtitle_renderer)
 
         if verbose:
             click.echo(f"Writing final video to {output}...")
 
-        # Use new output options with enhanced quality settings
+        # Rate control and tuning come from the encoder profile
         write_params = {
             "codec": video_codec,
             "audio_codec": audio_codec,
             "audio_bitrate": "192k",  # Higher audio quality
-            "preset": "slow",  # Better quality encoding (slower but worth it)
-            "threads": 4,
+            "preset": encoder_profile.preset,
+            "threads": threads,
             "logger": "bar",
-            "ffmpeg_params": [
-                "-profile:v", "high",
-                "-level:v", "4.1", 
-                "-pix_fmt", "yuv420p",
-                "-movflags", "+faststart",  # Optimize for web streaming
-            ],
+            "ffmpeg_params": encoder_profile.rate_args(video_bitrate) + OUTPUT_FFMPEG_PARAMS,
         }
-        if video_bitrate:
-            write_params["bitrate"] = video_bitrate
-        else:
-            write_params["bitrate"] = "8000k"  # Default high quality bitrate
 
         # Generate thumbnail from screenshot if available
         if screenshot_clip and screenshot and screenshot.exists():
@@ -567,8 +717,44 @@ def editor(
         if verbose:
             click.echo("Video editing complete.")
 
+    except click.ClickException:
+        raise
     except Exception as e:
-        click.echo(f"An error occurred during video editing: {e}", err=True)
+        raise click.ClickException(f"An error occurred during video editing: {e}") from e
+    finally:
+        if slice_dir:
+            shutil.rmtree(slice_dir, ignore_errors=True)
+
+
+@cli.command()
+@click.argument("videos", nargs=-1, required=True, type=Path)
+@click.option(
+    "-f",
+    "--format",
+    default="tiktok",
+    type=click.Choice(sorted(FORMAT_SIZES)),
+    help="Output video format the proxies are prepared for.",
+    show_default=True,
+)
+@click.option("--force", is_flag=True, default=False, help="Rebuild existing proxies.")
+@click.option("--verbose", is_flag=True, default=True, help="Enable verbose output.")
+def prepare(videos: tuple[Path, ...], format: str, force: bool, verbose: bool):
+    """Transcode background VIDEOS once into cropped, scaled proxies for FORMAT.
+
+    The editor picks these proxies up automatically for matching formats.
+    """
+    for video in videos:
+        if not video.exists():
+            click.echo(f"Error: Video file not found at {video}", err=True)
+            continue
+        try:
+            if verbose:
+                click.echo(f"Preparing {format} proxy for {video}...")
+            proxy = prepare_proxy(video, format, video_size(probe(video)), force=force)
+            if verbose:
+                click.echo(f"  Proxy ready: {proxy}")
+        except Exception as e:
+            click.echo(f"An error occurred while preparing {video}: {e}", err=True)
 
 
 @cli.command()
@@ -600,11 +786,30 @@ def editor(
 )
 @click.option(
     "--chunk_length",
-    default=3,
-    type=int,
-    help="Chunk length for batched inference (seconds).",
+    default=DEFAULT_CHUNK_LENGTH,
+    type=click.IntRange(min=1, max=30),
+    help="Maximum length of the speech chunks batched for inference (seconds).",
+    show_default=True,
+)
+@click.option(
+    "--vad",
+    default="silero",
+    type=click.Choice(VAD_METHODS),
+    help="Speech detection used to chunk the audio and skip silence. 'energy' needs no model; 'off' uses fixed chunks.",
     show_default=True,
 )
+@click.option(
+    "--vad_threshold",
+    default=None,
+    type=float,
+    help="Silero speech probability (0-1), or for 'energy' the level in dB below the loudest frame (e.g. -35).",
+)
+@click.option(
+    "--min_silence_ms",
+    default=None,
+    type=click.IntRange(min=0),
+    help="Shortest silence separating speech chunks. Defaults to the VAD's own.",
+)
 @click.option(
     "--temperature",
     default=0.0,
@@ -619,6 +824,31 @@ def editor(
     help="Language code (e.g., en, es) for transcription. Default is auto-detect.",
     show_default=True,
 )
+@click.option(
+    "--text",
+    default=None,
+    help="Known script of AUDIO_PATH. Words are force-aligned to it instead of transcribed.",
+)
+@click.option(
+    "--cache/--no-cache",
+    default=True,
+    help="Reuse an earlier transcription of the same audio with the same settings.",
+    show_default=True,
+)
+@click.option(
+    "--format",
+    "output_format",
+    default="text",
+    type=click.Choice(OUTPUT_FORMATS),
+    help="Output format. Segments are written as they are transcribed; with jsonl, srt and vtt only the transcript goes to stdout.",
+    show_default=True,
+)
+@click.option(
+    "--word_timestamps",
+    is_flag=True,
+    default=False,
+    help="Include word timestamps in jsonl output.",
+)
 @click.option("--verbose", is_flag=True, default=False, help="Enable verbose output.")
 def transcribe(
     audio_path: Path,
@@ -627,57 +857,313 @@ def transcribe(
     compute_type: str,
     batch_size: int,
     chunk_length: int,
+    vad: str,
+    vad_threshold: float | None,
+    min_silence_ms: int | None,
     temperature: float,
     language: str | None,
+    text: str | None,
+    cache: bool,
+    output_format: str,
+    word_timestamps: bool,
     verbose: bool,
 ):
-    """Transcribe AUDIO_PATH using Faster Whisper."""
-    if verbose:
-        click.echo("Starting transcription process...")
-        click.echo(f"Audio input: {audio_path}")
-        click.echo(
-            f"Model size: {model_size}, Device: {device}, Compute Type: {compute_type}"
-        )
-        click.echo(
-            f"Batch size: {batch_size}, Chunk length: {chunk_length}, Temperature: {temperature}"
-        )
-        click.echo(f"Language: {'Auto-detect' if language is None else language}")
-
-    if not audio_path.exists():
-        click.echo(f"Error: Audio file not found at {audio_path}", err=True)
-        return
-
-    try:
+    """Transcribe AUDIO_PATH using Faster Whisper, or align it to a known --text."""
+    # With a machine-readable format, stdout carries only the transcript
+    results = sys.stdout
+    quiet_stdout = redirect_stdout(sys.stderr) if output_format != "text" else nullcontext()
+    with quiet_stdout:
         if verbose:
-            click.echo("Initializing Whisper model...")
-        model = WhisperModel(model_size, device=device, compute_type=compute_type)
-        batched_model = BatchedInferencePipeline(model=model)
+            click.echo("Starting transcription process...")
+            click.echo(f"Audio input: {audio_path}")
+            click.echo(
+                f"Model size: {model_size}, Device: {device}, Compute Type: {compute_type}"
+            )
+            click.echo(
+                f"Batch size: {batch_size}, Chunk length: {chunk_length}, Temperature: {temperature}"
+            )
+            click.echo(f"VAD: {vad}")
+            click.echo(f"Language: {'Auto-detect' if language is None else language}")
 
-        if verbose:
-            click.echo(f"Transcribing {audio_path}...")
-        segments, info = batched_model.transcribe(
-            audio_path.as_posix(),
-            batch_size=batch_size,
-            chunk_length=chunk_length,  # Ensure this matches expected unit (seconds)
-            temperature=temperature,
-            language=language,  # Pass language if specified
-        )
+        if not audio_path.exists():
+            raise click.ClickException(f"Audio file not found at {audio_path}")
 
-        click.echo(
-            f"Detected language '{info.language}' with probability {info.language_probability:.2f}"
-        )
-        click.echo(f"Transcription (duration: {info.duration:.2f}s):")
+        try:
+            if text:
+                if verbose:
+                    click.echo(f"Aligning script to {audio_path}...")
+                try:
+                    words = align_words(audio_path, text, device=device)
+                except ImportError as e:
+                    raise click.ClickException(
+                        "Forced alignment requires torchaudio. Install with: pip install torchaudio"
+                    ) from e
+                click.echo(f"Alignment ({len(words)} words):")
+                for block in format_segments(
+                    (Segment(w.start, w.end, w.text, (w,)) for w in words), output_format
+                ):
+                    click.echo(block, file=results)
+                if verbose:
+                    click.echo("Alignment complete.")
+                return
+
+            if verbose:
+                click.echo(f"Transcribing {audio_path}...")
+            segments, info = transcribe_audio(
+                audio_path,
+                model_size,
+                device,
+                compute_type,
+                batch_size,
+                chunk_length=chunk_length,  # Ensure this matches expected unit (seconds)
+                temperature=temperature,
+                language=language,  # Pass language if specified
+                word_timestamps=word_timestamps,
+                vad=vad,
+                vad_threshold=vad_threshold,
+                min_silence_ms=min_silence_ms,
+                use_cache=cache,
+            )
 
-        for segment in segments:
             click.echo(
-                f"[{segment.start:.2f}s -> {segment.end:.2f}s] {segment.text.strip()}"
+                f"Detected language '{info.language}' with probability {info.language_probability:.2f}"
             )
+            click.echo(f"Transcription (duration: {info.duration:.2f}s):")
 
-        if verbose:
-            click.echo("Transcription complete.")
+            for block in format_segments(segments, output_format):
+                click.echo(block, file=results)
 
-    except Exception as e:
-        click.echo(f"An error occurred during transcription: {e}", err=True)
+            if verbose:
+                click.echo("Transcription complete.")
+
+        except click.ClickException:
+            raise
+        except Exception as e:
+            raise click.ClickException(f"An error occurred during transcription: {e}") from e
+
+
+@cli.command()
+@click.argument("manifest", type=Path)
+@click.option(
+    "--video",
+    default=BASE_DIR / "media" / "videos" / "minecraft.mp4",
+    type=Path,
+    help="Background video for entries that do not set their own.",
+    show_default=True,
+)
+@click.option(
+    "-f", "--format", default="tiktok", help="Output video format (e.g., tiktok, youtube).", show_default=True
+)
+@click.option(
+    "--font",
+    default=BASE_DIR / "utils" / "font.ttf",
+    type=Path,
+    help="Font file path for subtitles.",
+    show_default=True,
+)
+@click.option("--font-size", default=42, type=int, help="Font size for subtitles.", show_default=True)
+@click.option(
+    "--subtitle-position",
+    default="center",
+    help="Position of subtitles (e.g., center, bottom).",
+    show_default=True,
+)
+@click.option(
+    "-v", "--voice", default="af_sarah", help="AI voice to use.", show_default=True
+)
+@click.option(
+    "-s", "--speed", default=0.9, type=float, help="Speech speed (0.5-2.0).", show_default=True
+)
+@click.option(
+    "--loudness-target",
+    default=None,
+    type=float,
+    help="Normalize narrations to this integrated loudness in LUFS instead of peak level.",
+)
+@click.option(
+    "--model-size",
+    default="tiny",
+    help="Whisper model size, used when a narration has neither word timings nor a script.",
+    show_default=True,
+)
+@click.option("--device", default="cpu", help="Device for alignment and Whisper.", show_default=True)
+@click.option("--compute-type", default="int8", help="Compute type for Whisper.", show_default=True)
+@click.option("--batch-size", default=10, type=int, help="Batch size for Whisper.", show_default=True)
+@click.option(
+    "--profile",
+    default=DEFAULT_PROFILE,
+    type=click.Choice([*ENCODER_PROFILES, "auto"]),
+    help="Encoder profile. 'auto' picks one from the renders waiting in the render queue.",
+    show_default=True,
+)
+@click.option(
+    "--tts-workers",
+    default=1,
+    type=click.IntRange(min=1),
+    help="Processes synthesizing sentence chunks of a script in parallel.",
+    show_default=True,
+)
+@click.option(
+    "--render-workers",
+    default=2,
+    type=click.IntRange(min=1),
+    help="Videos rendered at once; the cores are shared between them.",
+    show_default=True,
+)
+@click.option(
+    "--upload-workers",
+    default=2,
+    type=click.IntRange(min=1),
+    help="Videos uploaded at once.",
+    show_default=True,
+)
+@click.option(
+    "--queue-size",
+    default=DEFAULT_QUEUE_SIZE,
+    type=click.IntRange(min=1),
+    help="Jobs allowed to wait in front of each stage.",
+    show_default=True,
+)
+@click.option(
+    "--upload/--no-upload",
+    default=True,
+    help="Upload the videos of entries with 'upload' metadata to YouTube.",
+    show_default=True,
+)
+@click.option(
+    "--privacy-status",
+    default="private",
+    type=click.Choice(["public", "private", "unlisted"]),
+    help="Privacy status of uploads that do not set their own.",
+    show_default=True,
+)
+@click.option(
+    "--use-proxy/--no-use-proxy",
+    default=True,
+    help="Use a background proxy prepared with the 'prepare' command when one exists.",
+    show_default=True,
+)
+@click.option(
+    "--cache/--no-cache",
+    default=True,
+    help="Reuse cached sentences and transcriptions. Scripts are then synthesized sentence by sentence (see 'audio --help').",
+    show_default=True,
+)
+@click.option("--verbose", is_flag=True, default=False, help="Show ffmpeg progress.")
+def pipeline(
+    manifest: Path,
+    video: Path,
+    format: str,
+    font: Path,
+    font_size: int,
+    subtitle_position: str,
+    voice: str,
+    speed: float,
+    loudness_target: float | None,
+    model_size: str,
+    device: str,
+    compute_type: str,
+    batch_size: int,
+    profile: str,
+    tts_workers: int,
+    render_workers: int,
+    upload_workers: int,
+    queue_size: int,
+    upload: bool,
+    privacy_status: str,
+    use_proxy: bool,
+    cache: bool,
+    verbose: bool,
+):
+    """Synthesize, subtitle, render and upload every script of MANIFEST.
+
+    Jobs flow through TTS, alignment, render and upload stages connected by
+    bounded queues, so one job renders while the next is synthesized. Each
+    line of MANIFEST is a JSON object such as {"id", "text", "output",
+    "voice", "video", "screenshot", "upload": {"title", ...}}; see
+    pipeline.read_jobs. Prints one JSON result line per job as it finishes.
+    """
+    jobs = read_jobs(manifest)
+    style = SubtitleStyle(font=font.as_posix(), font_size=font_size)
+    stages = [
+        Stage(
+            "tts",
+            partial(
+                synthesize_job,
+                voice=voice,
+                speed=speed,
+                workers=tts_workers,
+                use_cache=cache,
+                loudness_target=loudness_target,
+            ),
+        ),
+        Stage(
+            "align",
+            partial(
+                align_job,
+                model_size=model_size,
+                device=device,
+                compute_type=compute_type,
+                batch_size=batch_size,
+                use_cache=cache,
+            ),
+        ),
+        Stage(
+            "render",
+            partial(
+                render_job,
+                video=video,
+                format=format,
+                style=style,
+                profile=profile,
+                threads=encoder_threads(render_workers),
+                subtitle_position=subtitle_position,
+                use_proxy=use_proxy,
+                verbose=verbose,
+            ),
+            workers=render_workers,
+        ),
+    ]
+
+    # Keep logs away from the JSON result stream
+    results = sys.stdout
+    with redirect_stdout(sys.stderr):
+        if upload and any(job.entry.get("upload") for job in jobs):
+            stages.append(upload_stage(upload_workers, privacy_status))
+        for result in run_pipeline(jobs, stages, queue_size=queue_size):
+            results.write(json.dumps(result) + "\n")
+            results.flush()
+
+
+@cli.command()
+@click.option(
+    "--socket",
+    "socket_path",
+    default=None,
+    type=Path,
+    help="Listen on a Unix socket instead of stdin/stdout.",
+)
+@click.option(
+    "--memory-budget",
+    default=None,
+    type=float,
+    help="Memory budget in MB for resident models (LRU eviction). Defaults to MODEL_MEMORY_BUDGET_MB.",
+)
+def serve(socket_path: Path | None, memory_budget: float | None):
+    """Run a long-lived worker executing audio, editor and transcribe requests.
+
+    Each request is a JSON line such as
+    {"id": "1", "command": "audio", "args": ["Hello", "-o", "out.mp3"]}
+    and gets a JSON line response {"id": "1", "ok": true, "error": null, ...}
+    whose "output" holds what the command printed to stdout. Models stay loaded between requests, bounded by the memory budget.
+    """
+    if memory_budget is not None:
+        registry.budget_mb = memory_budget
+    if socket_path:
+        click.echo(f"Worker listening on {socket_path}", err=True)
+        serve_socket(cli, socket_path)
+    else:
+        serve_stdio(cli)
 
 
 @cli.command()
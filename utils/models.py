@@ -0,0 +1,204 @@
+"""
+Process-wide model registry.
+
+Every command (and utils/audio.py) fetches its Kokoro, Whisper, Dia and
+alignment models through this module so that a long-lived worker keeps them
+resident and can switch between configurations (e.g. `tiny` Whisper for the
+editor and `small` for transcribe) without reloading. Models are evicted least-recently-used
+first once the configured memory budget would be exceeded.
+
+The budget is read from the MODEL_MEMORY_BUDGET_MB environment variable and
+can be changed at runtime with `registry.budget_mb`. No budget means models
+are never evicted.
+"""
+
+import gc
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, NamedTuple, Optional
+
+# Approximate parameter counts, used to estimate resident memory
+WHISPER_PARAMS_M = {
+    "tiny": 39,
+    "tiny.en": 39,
+    "base": 74,
+    "base.en": 74,
+    "small": 244,
+    "small.en": 244,
+    "medium": 769,
+    "medium.en": 769,
+    "large": 1550,
+    "large-v1": 1550,
+    "large-v2": 1550,
+    "large-v3": 1550,
+    "turbo": 809,
+    "large-v3-turbo": 809,
+    "distil-large-v3": 756,
+}
+KOKORO_PARAMS_M = 82
+DIA_PARAMS_M = 1600
+MMS_FA_PARAMS_M = 315
+
+BYTES_PER_PARAM = {
+    "int8": 1,
+    "int8_float16": 2,
+    "int8_bfloat16": 2,
+    "int8_float32": 4,
+    "float16": 2,
+    "bfloat16": 2,
+    "float32": 4,
+    "default": 4,
+}
+
+DIA_MODEL_NAME = "nari-labs/Dia-1.6B"
+
+
+class ModelKey(NamedTuple):
+    family: str
+    size: str
+    device: str
+    compute_type: str
+    lang: str
+
+
+class ModelRegistry:
+    """LRU cache of loaded models bounded by an estimated memory budget."""
+
+    def __init__(self, budget_mb: Optional[float] = None):
+        self.budget_mb = budget_mb
+        self._models: OrderedDict[ModelKey, tuple[Any, float]] = OrderedDict()
+        self._lock = threading.RLock()
+
+    @property
+    def used_mb(self) -> float:
+        """Estimated memory held by resident models."""
+        return sum(size_mb for _, size_mb in self._models.values())
+
+    def keys(self) -> list[ModelKey]:
+        """Resident model keys, least recently used first."""
+        return list(self._models.keys())
+
+    def get(self, key: ModelKey, loader: Callable[[], Any], size_mb: float) -> Any:
+        """
+        Return the model for KEY, loading it with LOADER if it is not resident.
+
+        Args:
+            key: Identifies the model configuration
+            loader: Zero-argument callable building the model
+            size_mb: Estimated resident memory of the model
+
+        Returns:
+            The loaded model
+        """
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key][0]
+
+            self._make_room(size_mb)
+            model = loader()
+            self._models[key] = (model, size_mb)
+            return model
+
+    def evict(self, key: ModelKey) -> bool:
+        """Drop KEY from the registry. Returns False if it was not resident."""
+        with self._lock:
+            if self._models.pop(key, None) is None:
+                return False
+            _release_memory()
+            return True
+
+    def clear(self):
+        """Drop every resident model."""
+        with self._lock:
+            self._models.clear()
+            _release_memory()
+
+    def _make_room(self, size_mb: float):
+        if self.budget_mb is None:
+            return
+        evicted = False
+        while self._models and self.used_mb + size_mb > self.budget_mb:
+            self._models.popitem(last=False)
+            evicted = True
+        if evicted:
+            _release_memory()
+
+
+def _release_memory():
+    gc.collect()
+    try:
+        import torch
+
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except ImportError:
+        pass
+
+
+def _budget_from_env() -> Optional[float]:
+    value = os.environ.get("MODEL_MEMORY_BUDGET_MB")
+    return float(value) if value else None
+
+
+registry = ModelRegistry(budget_mb=_budget_from_env())
+
+
+def estimate_size_mb(params_m: float, compute_type: str = "float32") -> float:
+    """Estimate resident memory of a model with PARAMS_M million parameters."""
+    return params_m * BYTES_PER_PARAM.get(compute_type, 4)
+
+
+def get_kokoro_pipeline(lang_code: str = "a", device: str = "cpu"):
+    """Return a resident Kokoro KPipeline for LANG_CODE on DEVICE."""
+
+    def load():
+        from kokoro import KPipeline
+
+        return KPipeline(lang_code=lang_code, device=device)
+
+    key = ModelKey("kokoro", "82M", device, "float32", lang_code)
+    return registry.get(key, load, estimate_size_mb(KOKORO_PARAMS_M))
+
+
+def get_whisper_pipeline(
+    model_size: str, device: str = "cpu", compute_type: str = "int8"
+):
+    """Return a resident batched Whisper pipeline for the given settings."""
+
+    def load():
+        from faster_whisper import BatchedInferencePipeline, WhisperModel
+
+        model = WhisperModel(model_size, device=device, compute_type=compute_type)
+        return BatchedInferencePipeline(model=model)
+
+    key = ModelKey("whisper", model_size, device, compute_type, "")
+    params_m = WHISPER_PARAMS_M.get(model_size, WHISPER_PARAMS_M["large"])
+    return registry.get(key, load, estimate_size_mb(params_m, compute_type))
+
+
+def get_dia_model(model_name: str = DIA_MODEL_NAME, device: str = "auto"):
+    """Return a resident Dia model."""
+
+    def load():
+        from dia.model import Dia
+
+        return Dia.from_pretrained(model_name)
+
+    key = ModelKey("dia", model_name, device, "float32", "")
+    return registry.get(key, load, estimate_size_mb(DIA_PARAMS_M))
+
+
+def get_alignment_model(device: str = "cpu"):
+    """Return a resident MMS forced-alignment bundle as (model, tokenizer, aligner)."""
+
+    def load():
+        import torchaudio
+
+        bundle = torchaudio.pipelines.MMS_FA
+        model = bundle.get_model(with_star=False).to(device)
+        return model, bundle.get_tokenizer(), bundle.get_aligner()
+
+    key = ModelKey("mms_fa", "300m", device, "float32", "")
+    return registry.get(key, load, estimate_size_mb(MMS_FA_PARAMS_M))
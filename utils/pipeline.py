@@ -0,0 +1,361 @@
+"""
+Pipelined job runner for the `pipeline` command.
+
+Runs a batch of scripts through speech synthesis, subtitle alignment, render
+and upload as stages connected by bounded queues, each stage with its own
+workers. While job N renders, job N+1 is synthesized and job N-1 uploads, so
+throughput approaches that of the slowest stage rather than the sum of all
+stages. The bounded queues keep a fast stage from running far ahead of a slow
+one.
+
+Stage workers are threads. Synthesis spreads sentences over its own process
+pool, alignment runs in torch or CTranslate2, and render and upload wait on
+ffmpeg and the network, so none of them holds the GIL for long.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+import click
+
+from background import choose_background
+from render import media_duration, probe, render_editor, resolve_profile, video_size
+from subtitles import SubtitleStyle, Word
+from synthesis import synthesize_kokoro
+from transcription import resolve_subtitle_words
+
+# Jobs waiting in front of each stage
+DEFAULT_QUEUE_SIZE = 2
+
+
+@dataclass
+class Job:
+    """One script on its way through the pipeline."""
+
+    id: str
+    index: int
+    total: int
+    entry: dict
+    audio: Path
+    output: Path
+    words: list[Word] = field(default_factory=list)
+    video_id: Optional[str] = None
+    error: Optional[str] = None
+    # Seconds spent in each stage
+    stages: dict[str, float] = field(default_factory=dict)
+    started: float = 0.0
+    # Jobs waiting for the current stage when it took this one
+    queued: int = 0
+
+    def result(self) -> dict:
+        return {
+            "id": self.id,
+            "ok": self.error is None,
+            "audio": self.audio.as_posix(),
+            "output": self.output.as_posix(),
+            "video_id": self.video_id,
+            "error": self.error,
+            "stages": self.stages,
+            "elapsed": round(time.perf_counter() - self.started, 3),
+            "index": self.index + 1,
+            "total": self.total,
+        }
+
+
+@dataclass(frozen=True)
+class Stage:
+    """A pipeline step run on each job by WORKERS threads."""
+
+    name: str
+    run: Callable[[Job], None]
+    workers: int = 1
+
+
+# Sent down a queue once no more jobs will follow
+_DONE = object()
+
+
+def _upload_metadata_problem(metadata) -> Optional[str]:
+    if metadata is None or isinstance(metadata, bool):
+        return None
+    if not isinstance(metadata, dict):
+        return "'upload' must be true or an object"
+    for name in ("title", "description", "category", "privacyStatus"):
+        if name in metadata and not isinstance(metadata[name], str):
+            return f"'upload.{name}' must be a string"
+    keywords = metadata.get("keywords", "")
+    if not (
+        isinstance(keywords, str)
+        or (isinstance(keywords, list) and all(isinstance(k, str) for k in keywords))
+    ):
+        return "'upload.keywords' must be a list of strings or a comma-separated string"
+    return None
+
+
+def read_jobs(path: Path) -> list[Job]:
+    """
+    Read a pipeline manifest.
+
+    Each line is a JSON object with "output" (the video to render) and either
+    "text" (the script to synthesize) or "audio" (an existing narration).
+    Entries may set "id", "audio" (where the narration is written), "voice",
+    "speed", "video", "screenshot", "format" and "upload" (true, or an
+    object with string "title", "description", "category" and
+    "privacyStatus", and "keywords" as a list or comma-separated string).
+    Blank lines are ignored.
+    """
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "output" not in entry or not ("text" in entry or "audio" in entry):
+                raise click.UsageError(
+                    f"{path}:{line_number}: entries need 'output' and 'text' or 'audio'"
+                )
+            # Caught here rather than after the job was synthesized and rendered
+            problem = _upload_metadata_problem(entry.get("upload"))
+            if problem:
+                raise click.UsageError(f"{path}:{line_number}: {problem}")
+            entries.append(entry)
+
+    jobs = []
+    for index, entry in enumerate(entries):
+        output = Path(entry["output"])
+        jobs.append(
+            Job(
+                id=str(entry.get("id", index)),
+                index=index,
+                total=len(entries),
+                entry=entry,
+                audio=Path(entry.get("audio", output.with_suffix(".mp3"))),
+                output=output,
+            )
+        )
+    return jobs
+
+
+def run_pipeline(
+    jobs: list[Job], stages: list[Stage], queue_size: int = DEFAULT_QUEUE_SIZE
+) -> Iterator[dict]:
+    """
+    Run JOBS through STAGES, yielding each job's result as it completes.
+
+    Every stage takes jobs from a queue holding at most QUEUE_SIZE, so a
+    stage blocks once the next one falls that far behind. A job that fails
+    skips its remaining stages. Results are yielded in completion order.
+    """
+    inboxes = [queue.Queue(maxsize=queue_size) for _ in stages]
+    results = queue.Queue()
+    queues = inboxes + [results]
+    # Workers reading each queue after the first, each of which must be told
+    # when to stop
+    readers = [stage.workers for stage in stages[1:]] + [1]
+    running = [stage.workers for stage in stages]
+    # Jobs sent to each queue and not taken yet (qsize() would count _DONE)
+    waiting = [0] * len(queues)
+    lock = threading.Lock()
+
+    def send(index: int, job: Job):
+        with lock:
+            waiting[index] += 1
+        queues[index].put(job)
+
+    def feed():
+        for job in jobs:
+            job.started = time.perf_counter()
+            send(0, job)
+        for _ in range(stages[0].workers):
+            inboxes[0].put(_DONE)
+
+    def work(index: int):
+        stage = stages[index]
+        while True:
+            job = inboxes[index].get()
+            if job is _DONE:
+                with lock:
+                    running[index] -= 1
+                    last = running[index] == 0
+                # The last worker of a stage closes the next one
+                if last:
+                    for _ in range(readers[index]):
+                        queues[index + 1].put(_DONE)
+                return
+            with lock:
+                waiting[index] -= 1
+                job.queued = waiting[index]
+            if job.error is None:
+                started = time.perf_counter()
+                try:
+                    stage.run(job)
+                except Exception as e:
+                    job.error = f"{stage.name}: {type(e).__name__}: {e}"
+                job.stages[stage.name] = round(time.perf_counter() - started, 3)
+            send(index + 1, job)
+
+    threads = [threading.Thread(target=feed, daemon=True)]
+    for index, stage in enumerate(stages):
+        threads += [
+            threading.Thread(target=work, args=(index,), name=f"{stage.name}-{n}", daemon=True)
+            for n in range(stage.workers)
+        ]
+    for thread in threads:
+        thread.start()
+
+    while (job := results.get()) is not _DONE:
+        yield job.result()
+
+
+def synthesize_job(
+    job: Job,
+    voice: str,
+    speed: float,
+    workers: int = 1,
+    use_cache: bool = True,
+    loudness_target: Optional[float] = None,
+):
+    """Synthesize the script of JOB with Kokoro, writing its word timings."""
+    text = job.entry.get("text")
+    if text is None:
+        if not job.audio.exists():
+            raise FileNotFoundError(f"Audio not found: {job.audio}")
+        return
+    job.audio.parent.mkdir(parents=True, exist_ok=True)
+    synthesize_kokoro(
+        text,
+        job.audio,
+        voice=job.entry.get("voice", voice),
+        speed=float(job.entry.get("speed", speed)),
+        word_timings=True,
+        workers=workers,
+        use_cache=use_cache,
+        loudness_target=loudness_target,
+    )
+
+
+def align_job(
+    job: Job,
+    model_size: str,
+    device: str,
+    compute_type: str,
+    batch_size: int,
+    use_cache: bool = True,
+):
+    """Find the subtitle words of JOB's narration."""
+    job.words = resolve_subtitle_words(
+        job.audio,
+        model_size,
+        device,
+        compute_type,
+        batch_size,
+        text=job.entry.get("text"),
+        use_cache=use_cache,
+    )
+
+
+def render_job(
+    job: Job,
+    video: Path,
+    format: str,
+    style: SubtitleStyle,
+    profile: str,
+    threads: int,
+    subtitle_position: str = "center",
+    use_proxy: bool = True,
+    verbose: bool = False,
+):
+    """
+    Render JOB with the ffmpeg engine.
+
+    With PROFILE 'auto', the renders waiting in the render queue set the
+    queue depth.
+    """
+    format = job.entry.get("format", format)
+    duration = media_duration(probe(job.audio))
+    source, video_info, start = choose_background(
+        Path(job.entry.get("video", video)), duration, format, use_proxy
+    )
+    screenshot = Path(job.entry["screenshot"]) if job.entry.get("screenshot") else None
+    job.output.parent.mkdir(parents=True, exist_ok=True)
+    render_editor(
+        source,
+        job.audio,
+        job.output,
+        job.words,
+        style,
+        format,
+        start,
+        duration,
+        video_size(video_info),
+        subtitle_position=subtitle_position,
+        screenshot=screenshot if screenshot and screenshot.exists() else None,
+        verbose=verbose,
+        profile=resolve_profile(profile, job.queued),
+        threads=threads,
+    )
+
+
+def upload_stage(workers: int, privacy_status: str = "private", json_progress: bool = False) -> Stage:
+    """
+    Stage uploading every job whose entry has "upload" metadata.
+
+    One discovery client and one backoff scheduler are shared by the WORKERS;
+    each worker thread has its own authorized connection and event loop.
+    """
+    import upload
+
+    if not (os.path.exists(upload.TOKEN_PICKLE_FILE) or os.path.exists(upload.CLIENT_SECRETS_FILE)):
+        raise click.UsageError(
+            f"Uploads need the client secrets file {upload.CLIENT_SECRETS_FILE}; use --no-upload to skip them."
+        )
+    credentials = upload.get_credentials()
+    youtube = upload.get_authenticated_service(credentials)
+    scheduler = upload.BackoffScheduler()
+    local = threading.local()
+
+    def upload_job(job: Job):
+        metadata = job.entry.get("upload")
+        if not metadata:
+            return
+        if not hasattr(local, "connection"):
+            from google_auth_httplib2 import AuthorizedHttp
+            from googleapiclient.http import build_http
+
+            local.connection = AuthorizedHttp(credentials, http=build_http())
+        metadata = dict(metadata) if isinstance(metadata, dict) else {}
+        if isinstance(metadata.get("keywords"), list):
+            metadata["keywords"] = ",".join(metadata["keywords"])
+        options = argparse.Namespace(
+            **{
+                "file": job.output.as_posix(),
+                "title": job.id,
+                "description": "",
+                "category": "22",
+                "keywords": "",
+                "privacyStatus": privacy_status,
+                "chunk_size": upload.DEFAULT_CHUNK_SIZE_MB,
+                "progress": "json" if json_progress else "text",
+                "resume": True,
+                "deadline": None,
+                **metadata,
+            }
+        )
+        result = asyncio.run(
+            upload.initialize_upload(
+                youtube, options, connection=local.connection, scheduler=scheduler
+            )
+        )
+        if not result.ok:
+            raise RuntimeError(result.error)
+        job.video_id = result.video_id
+
+    return Stage("upload", upload_job, workers)
@@ -0,0 +1,636 @@
+"""
+ffmpeg render path for the editor.
+
+Builds a single ffmpeg filtergraph (trim, crop, scale, screenshot overlay and
+burned-in ASS subtitles) so that frames never enter Python. Used by
+`main.py editor --engine ffmpeg`, optionally split into segments rendered in
+parallel (`--segments`) or producing several formats from one decode
+(`--formats`).
+"""
+
+import json
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from fractions import Fraction
+from pathlib import Path
+from typing import Optional
+
+from subtitles import SubtitleStyle, Word, write_ass
+
+# Output flags shared by every render path
+OUTPUT_FFMPEG_PARAMS = [
+    "-profile:v", "high",
+    "-level:v", "4.1",
+    "-pix_fmt", "yuv420p",
+    "-movflags", "+faststart",  # Optimize for web streaming
+]
+
+# Output frame size per format; formats not listed keep the source size
+FORMAT_SIZES = {
+    "tiktok": (720, 1280),
+}
+
+SCREENSHOT_DURATION = 5
+SCREENSHOT_WIDTH_RATIO = 0.8
+
+# Keyframe interval of segmented renders; segments are whole GOPs
+SEGMENT_GOP_SECONDS = 2
+
+
+@dataclass(frozen=True)
+class EncoderProfile:
+    """
+    Video encoder settings for a render.
+
+    Rate control is constant quality (CRF) unless a bitrate is set.
+    """
+
+    name: str
+    preset: str
+    crf: Optional[int] = None
+    bitrate: Optional[str] = None
+    tune: Optional[str] = None
+
+    def rate_args(self, video_bitrate: Optional[str] = None) -> list[str]:
+        """ffmpeg rate control and tuning flags. VIDEO_BITRATE overrides the profile."""
+        args = []
+        if video_bitrate or self.bitrate:
+            args += ["-b:v", video_bitrate or self.bitrate]
+        elif self.crf is not None:
+            args += ["-crf", str(self.crf)]
+        if self.tune:
+            args += ["-tune", self.tune]
+        return args
+
+
+ENCODER_PROFILES = {
+    # Previews: fastest presets, visibly softer
+    "draft": EncoderProfile("draft", preset="veryfast", crf=28, tune="fastdecode"),
+    # Indistinguishable from archive on 720x1280 shorts at a fraction of the time
+    "balanced": EncoderProfile("balanced", preset="fast", crf=21),
+    # The original settings
+    "archive": EncoderProfile("archive", preset="slow", bitrate="8000k"),
+}
+DEFAULT_PROFILE = "balanced"
+
+# Queue depths from which `auto` trades quality for throughput
+AUTO_PROFILE_DEPTHS = (
+    (8, "draft"),
+    (1, "balanced"),
+    (0, "archive"),
+)
+
+
+def auto_profile(queue_depth: int) -> EncoderProfile:
+    """Profile for a render with QUEUE_DEPTH more renders waiting behind it."""
+    for depth, name in AUTO_PROFILE_DEPTHS:
+        if queue_depth >= depth:
+            return ENCODER_PROFILES[name]
+    return ENCODER_PROFILES[DEFAULT_PROFILE]
+
+
+def resolve_profile(name: str, queue_depth: int = 0) -> EncoderProfile:
+    """Profile called NAME, or the automatic choice for QUEUE_DEPTH when NAME is 'auto'."""
+    if name == "auto":
+        return auto_profile(queue_depth)
+    return ENCODER_PROFILES[name]
+
+
+def available_cores() -> int:
+    """CPU cores this process may run on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available on macOS
+        return os.cpu_count() or 1
+
+
+def encoder_threads(concurrent_renders: int = 1) -> int:
+    """Encoder threads per render when CONCURRENT_RENDERS share the machine."""
+    return max(available_cores() // max(concurrent_renders, 1), 1)
+
+
+def probe(path: Path) -> dict:
+    """Return ffprobe's format and stream information for PATH."""
+    result = subprocess.run(
+        [
+            "ffprobe",
+            "-v", "error",
+            "-print_format", "json",
+            "-show_format",
+            "-show_streams",
+            path.as_posix(),
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout)
+
+
+def media_duration(info: dict) -> float:
+    """Duration in seconds from PROBE output."""
+    return float(info["format"]["duration"])
+
+
+def video_size(info: dict) -> tuple[int, int]:
+    """Width and height of the first video stream in PROBE output."""
+    for stream in info["streams"]:
+        if stream.get("codec_type") == "video":
+            return int(stream["width"]), int(stream["height"])
+    raise ValueError("No video stream found")
+
+
+def get_crop_coordinates(video_width, video_height):
+    """
+    Calculates crop coordinates for converting a 16:9 video to a 9:16 video.
+    It crops off the left and right parts while retaining the full vertical resolution.
+
+    Parameters:
+        video_width (float or int): The original video width.
+        video_height (float or int): The original video height.
+
+    Returns:
+        dict: A dictionary containing:
+              - x1: The left x-coordinate of the crop.
+              - y1: The top y-coordinate (always 0).
+              - x2: The right x-coordinate of the crop.
+              - y2: The bottom y-coordinate (equal to video_height).
+              - crop_width: The width of the cropped area.
+              - crop_height: The height of the cropped area.
+    """
+    # Calculate the required crop width for a 9:16 aspect ratio using the full height.
+    crop_width = video_height * (9 / 16)
+
+    # Center the crop horizontally by calculating x1 and x2.
+    x1 = (video_width - crop_width) / 2
+    x2 = x1 + crop_width
+
+    # Use the full height.
+    y1 = 0
+    y2 = video_height
+
+    return {"x1": x1, "y1": y1, "x2": x2, "y2": y2, "w": crop_width, "h": video_height}
+
+
+def subtitle_box(frame_h: int) -> tuple[int, int]:
+    """Size of the subtitle box for a frame FRAME_H pixels high."""
+    return int((frame_h * (9 / 16)) * 0.8), int(frame_h * 0.15)
+
+
+def background_filter(format: str, source_size: tuple[int, int]) -> tuple[str, tuple[int, int]]:
+    """
+    Filter chain turning the background into FORMAT.
+
+    Returns:
+        Tuple of (filter chain, output frame size)
+    """
+    if format not in FORMAT_SIZES:
+        return "null", source_size
+
+    out_w, out_h = FORMAT_SIZES[format]
+    if tuple(source_size) == (out_w, out_h):
+        # Already prepared for this format (e.g. a proxy)
+        return "null", source_size
+    crop = get_crop_coordinates(*source_size)
+    chain = ",".join(
+        [
+            f"crop={int(crop['w'])}:{int(crop['h'])}:{int(crop['x1'])}:{int(crop['y1'])}",
+            f"scale=-2:{out_h}",
+            f"crop={out_w}:{out_h}",
+        ]
+    )
+    return chain, (out_w, out_h)
+
+
+def video_encoder_args(
+    video_codec: str = "libx264",
+    profile: EncoderProfile = ENCODER_PROFILES[DEFAULT_PROFILE],
+    video_bitrate: Optional[str] = None,
+    threads: Optional[int] = None,
+    gop: Optional[int] = None,
+) -> list[str]:
+    """ffmpeg output flags for the video encoder."""
+    args = [
+        "-c:v", video_codec,
+        "-preset", profile.preset,
+        "-threads", str(threads or encoder_threads()),
+        *profile.rate_args(video_bitrate),
+    ]
+    if gop:
+        args += ["-g", str(gop)]
+    return args
+
+
+def build_editor_command(
+    video: Path,
+    audio: Optional[Path],
+    output: Path,
+    start: float,
+    duration: float,
+    source_size: tuple[int, int],
+    format: str,
+    subtitles_file: str,
+    screenshot: Optional[Path] = None,
+    thumbnail: Optional[Path] = None,
+    video_codec: str = "libx264",
+    audio_codec: str = "aac",
+    profile: EncoderProfile = ENCODER_PROFILES[DEFAULT_PROFILE],
+    video_bitrate: Optional[str] = None,
+    threads: Optional[int] = None,
+    screenshot_duration: float = SCREENSHOT_DURATION,
+    frames: Optional[int] = None,
+    gop: Optional[int] = None,
+    verbose: bool = True,
+) -> list[str]:
+    """
+    Build the ffmpeg command rendering the editor output in one pass.
+
+    SUBTITLES_FILE is referenced relative to the working directory ffmpeg is
+    run from, alongside the subtitle font, to avoid filtergraph path escaping.
+    PROFILE selects the encoder settings; THREADS defaults to every core.
+    Without AUDIO only the video is rendered, limited to FRAMES frames when
+    given (used for segments).
+    """
+    chain, (out_w, _) = background_filter(format, source_size)
+
+    # -nostdin: ffmpeg otherwise reads key presses from stdin, which is the
+    # request stream under `main.py serve`
+    cmd = ["ffmpeg", "-y", "-hide_banner", "-nostdin"]
+    if not verbose:
+        cmd += ["-loglevel", "error"]
+
+    # Input seek: jump to the random start before decoding anything
+    cmd += ["-ss", f"{start:.6f}", "-t", f"{duration:.3f}", "-i", video.as_posix()]
+    inputs = 1
+    if audio:
+        cmd += ["-i", audio.as_posix()]
+        inputs += 1
+
+    filters = [f"[0:v]{chain}[bg]"]
+    last = "bg"
+    if screenshot and screenshot_duration > 0:
+        cmd += ["-loop", "1", "-t", f"{screenshot_duration:.3f}", "-i", screenshot.as_posix()]
+        filters.append(f"[{inputs}:v]scale={int(out_w * SCREENSHOT_WIDTH_RATIO)}:-1[shot]")
+        filters.append(f"[{last}][shot]overlay=(W-w)/2:(H-h)/2:eof_action=pass[ov]")
+        last = "ov"
+
+    filters.append(f"[{last}]subtitles={subtitles_file}:fontsdir=.[v]")
+    if thumbnail:
+        filters.append("[v]split=2[vout][thumb]")
+        video_out = "vout"
+    else:
+        video_out = "v"
+
+    cmd += ["-filter_complex", ";".join(filters)]
+    cmd += ["-map", f"[{video_out}]"]
+    cmd += video_encoder_args(video_codec, profile, video_bitrate, threads, gop)
+    if audio:
+        cmd += ["-map", "1:a", "-c:a", audio_codec, "-b:a", "192k"]
+    cmd += OUTPUT_FFMPEG_PARAMS
+    if frames:
+        cmd += ["-frames:v", str(frames)]
+    else:
+        cmd += ["-t", f"{duration:.3f}"]
+    cmd.append(output.as_posix())
+    if thumbnail:
+        cmd += ["-map", "[thumb]", "-frames:v", "1", thumbnail.as_posix()]
+    return cmd
+
+
+def _prepare_workdir(workdir: Path, style: SubtitleStyle):
+    # ASS files reference the font by name from the working directory
+    shutil.copyfile(style.font, workdir / Path(style.font).name)
+
+
+def render_editor(
+    video: Path,
+    audio: Path,
+    output: Path,
+    words: list[Word],
+    style: SubtitleStyle,
+    format: str,
+    start: float,
+    duration: float,
+    source_size: tuple[int, int],
+    subtitle_position: str = "center",
+    screenshot: Optional[Path] = None,
+    verbose: bool = True,
+    **encode,
+):
+    """
+    Render the editor output with ffmpeg.
+
+    Writes the subtitles as an ASS file next to a copy of the font in a
+    temporary directory and runs a single ffmpeg filtergraph from there.
+    A thumbnail is saved next to OUTPUT when a screenshot is overlaid.
+    """
+    _, frame_size = background_filter(format, source_size)
+    thumbnail = output.with_suffix(".png") if screenshot else None
+
+    with tempfile.TemporaryDirectory() as workdir:
+        _prepare_workdir(Path(workdir), style)
+        write_ass(
+            words,
+            Path(workdir) / "subtitles.ass",
+            style,
+            frame_size,
+            subtitle_box(frame_size[1]),
+            subtitle_position,
+        )
+
+        cmd = build_editor_command(
+            video.resolve(),
+            audio.resolve(),
+            output.resolve(),
+            start,
+            duration,
+            source_size,
+            format,
+            "subtitles.ass",
+            screenshot=screenshot.resolve() if screenshot else None,
+            thumbnail=thumbnail.resolve() if thumbnail else None,
+            verbose=verbose,
+            **encode,
+        )
+        subprocess.run(cmd, cwd=workdir, check=True)
+
+
+def frame_rate(info: dict) -> Fraction:
+    """Frame rate of the first video stream in PROBE output."""
+    for stream in info["streams"]:
+        if stream.get("codec_type") == "video":
+            return Fraction(stream["r_frame_rate"])
+    raise ValueError("No video stream found")
+
+
+def frame_seconds(frame: int, fps: Fraction) -> float:
+    """
+    Time of FRAME at FPS for an ffmpeg seek.
+
+    Rounded down to ffmpeg's microsecond precision, so the seek never lands
+    after the frame and drops it.
+    """
+    microseconds = frame * 1_000_000 * fps.denominator // fps.numerator
+    return microseconds / 1_000_000
+
+
+def segment_frames(total_frames: int, segments: int, gop: int) -> list[tuple[int, int]]:
+    """
+    Split TOTAL_FRAMES into at most SEGMENTS (first frame, frame count) ranges.
+
+    Every range but the last is a whole number of GOPs, so each segment
+    starts on a keyframe of the output and the segments concatenate exactly.
+    """
+    gops = max(math.ceil(total_frames / gop), 1)
+    segments = max(min(segments, gops), 1)
+    ranges = []
+    first = 0
+    for i in range(segments):
+        # Spread the GOPs as evenly as possible
+        end = min(round(gops * (i + 1) / segments) * gop, total_frames)
+        if end > first:
+            ranges.append((first, end - first))
+        first = end
+    return ranges
+
+
+def shift_words(words: list[Word], offset: float, duration: float) -> list[Word]:
+    """WORDS shown within [OFFSET, OFFSET + DURATION), with times relative to OFFSET."""
+    return [
+        Word(max(w.start - offset, 0.0), min(w.end, offset + duration) - offset, w.text)
+        for w in words
+        if w.end > offset and w.start < offset + duration
+    ]
+
+
+def render_segmented(
+    video: Path,
+    audio: Path,
+    output: Path,
+    words: list[Word],
+    style: SubtitleStyle,
+    format: str,
+    start: float,
+    duration: float,
+    source_size: tuple[int, int],
+    fps: Fraction,
+    segments: int,
+    subtitle_position: str = "center",
+    screenshot: Optional[Path] = None,
+    verbose: bool = True,
+    audio_codec: str = "aac",
+    **encode,
+):
+    """
+    Render the editor output as SEGMENTS GOP-aligned pieces in parallel.
+
+    Each segment (background, overlay and subtitles for its range of the
+    timeline) is encoded by its own ffmpeg process with a share of the cores.
+    The video segments are then joined with the concat demuxer without
+    re-encoding, and the audio is encoded once while muxing.
+    """
+    _, frame_size = background_filter(format, source_size)
+    thumbnail = output.with_suffix(".png") if screenshot else None
+    gop = max(round(fps * SEGMENT_GOP_SECONDS), 1)
+    ranges = segment_frames(math.ceil(duration * fps), segments, gop)
+    # Segments are seeked to by whole source frames so their joins neither
+    # repeat nor skip a frame
+    start_frame = round(start * fps)
+    threads = encoder_threads(len(ranges))
+
+    with tempfile.TemporaryDirectory() as workdir:
+        workdir = Path(workdir)
+        _prepare_workdir(workdir, style)
+
+        commands = []
+        for i, (first, count) in enumerate(ranges):
+            offset = float(first / fps)
+            length = float(count / fps)
+            write_ass(
+                shift_words(words, offset, length),
+                workdir / f"subtitles_{i}.ass",
+                style,
+                frame_size,
+                subtitle_box(frame_size[1]),
+                subtitle_position,
+            )
+            commands.append(
+                build_editor_command(
+                    video.resolve(),
+                    None,
+                    workdir / f"segment_{i}.mp4",
+                    frame_seconds(start_frame + first, fps),
+                    # One frame of slack so rounding never drops the last frame
+                    length + float(1 / fps),
+                    source_size,
+                    format,
+                    f"subtitles_{i}.ass",
+                    screenshot=screenshot.resolve() if screenshot else None,
+                    thumbnail=thumbnail.resolve() if thumbnail and i == 0 else None,
+                    threads=threads,
+                    screenshot_duration=SCREENSHOT_DURATION - offset,
+                    frames=count,
+                    gop=gop,
+                    verbose=verbose,
+                    **encode,
+                )
+            )
+
+        with ThreadPoolExecutor(max_workers=len(commands)) as executor:
+            # Each command is a separate ffmpeg process; threads only wait on them
+            for future in [
+                executor.submit(subprocess.run, cmd, cwd=workdir, check=True) for cmd in commands
+            ]:
+                future.result()
+
+        concat_list = workdir / "segments.txt"
+        concat_list.write_text(
+            "".join(f"file 'segment_{i}.mp4'\n" for i in range(len(commands)))
+        )
+        cmd = ["ffmpeg", "-y", "-hide_banner", "-nostdin"]
+        if not verbose:
+            cmd += ["-loglevel", "error"]
+        cmd += [
+            "-f", "concat",
+            "-safe", "0",
+            "-i", concat_list.name,
+            "-i", audio.resolve().as_posix(),
+            "-map", "0:v",
+            "-map", "1:a",
+            "-c:v", "copy",
+            "-c:a", audio_codec,
+            "-b:a", "192k",
+            "-movflags", "+faststart",
+            "-t", f"{duration:.3f}",
+            output.resolve().as_posix(),
+        ]
+        subprocess.run(cmd, cwd=workdir, check=True)
+
+
+def format_output(output: Path, format: str) -> Path:
+    """Output path of FORMAT when several formats are rendered from OUTPUT."""
+    return output.with_name(f"{output.stem}_{format}{output.suffix}")
+
+
+def build_multi_format_command(
+    video: Path,
+    audio: Path,
+    outputs: list[tuple[str, Path, str, Optional[Path]]],
+    start: float,
+    duration: float,
+    source_size: tuple[int, int],
+    screenshot: Optional[Path] = None,
+    video_codec: str = "libx264",
+    audio_codec: str = "aac",
+    profile: EncoderProfile = ENCODER_PROFILES[DEFAULT_PROFILE],
+    video_bitrate: Optional[str] = None,
+    threads: Optional[int] = None,
+    verbose: bool = True,
+) -> list[str]:
+    """
+    Build one ffmpeg command rendering several formats from a single decode.
+
+    OUTPUTS holds (format, output, subtitles file, thumbnail) per variant.
+    The background and screenshot are decoded once and split into one
+    branch per format, each with its own crop, overlay, subtitles and encoder.
+    """
+    cmd = ["ffmpeg", "-y", "-hide_banner", "-nostdin"]
+    if not verbose:
+        cmd += ["-loglevel", "error"]
+    cmd += ["-ss", f"{start:.6f}", "-t", f"{duration:.3f}", "-i", video.as_posix()]
+    cmd += ["-i", audio.as_posix()]
+    if screenshot:
+        cmd += ["-loop", "1", "-t", str(SCREENSHOT_DURATION), "-i", screenshot.as_posix()]
+
+    count = len(outputs)
+    filters = [f"[0:v]split={count}" + "".join(f"[bg{i}]" for i in range(count))]
+    if screenshot:
+        filters.append(f"[2:v]split={count}" + "".join(f"[img{i}]" for i in range(count)))
+
+    output_args = []
+    for i, (format, output, subtitles_file, thumbnail) in enumerate(outputs):
+        chain, (out_w, _) = background_filter(format, source_size)
+        filters.append(f"[bg{i}]{chain}[fmt{i}]")
+        last = f"fmt{i}"
+        if screenshot:
+            filters.append(f"[img{i}]scale={int(out_w * SCREENSHOT_WIDTH_RATIO)}:-1[shot{i}]")
+            filters.append(f"[{last}][shot{i}]overlay=(W-w)/2:(H-h)/2:eof_action=pass[ov{i}]")
+            last = f"ov{i}"
+        filters.append(f"[{last}]subtitles={subtitles_file}:fontsdir=.[v{i}]")
+        video_out = f"v{i}"
+        if thumbnail:
+            filters.append(f"[v{i}]split=2[vout{i}][thumb{i}]")
+            video_out = f"vout{i}"
+
+        output_args += ["-map", f"[{video_out}]", "-map", "1:a"]
+        output_args += video_encoder_args(video_codec, profile, video_bitrate, threads)
+        output_args += [
+            "-c:a", audio_codec,
+            "-b:a", "192k",
+            *OUTPUT_FFMPEG_PARAMS,
+            "-t", f"{duration:.3f}",
+            output.as_posix(),
+        ]
+        if thumbnail:
+            output_args += ["-map", f"[thumb{i}]", "-frames:v", "1", thumbnail.as_posix()]
+
+    cmd += ["-filter_complex", ";".join(filters)]
+    return cmd + output_args
+
+
+def render_multi_format(
+    video: Path,
+    audio: Path,
+    outputs: dict[str, Path],
+    words: list[Word],
+    style: SubtitleStyle,
+    start: float,
+    duration: float,
+    source_size: tuple[int, int],
+    subtitle_position: str = "center",
+    screenshot: Optional[Path] = None,
+    verbose: bool = True,
+    **encode,
+):
+    """
+    Render every format in OUTPUTS (format -> output path) with one ffmpeg run.
+
+    The words are laid out once per frame size. Encoder threads are shared
+    between the outputs.
+    """
+    with tempfile.TemporaryDirectory() as workdir:
+        workdir = Path(workdir)
+        _prepare_workdir(workdir, style)
+
+        variants = []
+        for i, (format, output) in enumerate(outputs.items()):
+            _, frame_size = background_filter(format, source_size)
+            write_ass(
+                words,
+                workdir / f"subtitles_{i}.ass",
+                style,
+                frame_size,
+                subtitle_box(frame_size[1]),
+                subtitle_position,
+            )
+            thumbnail = output.with_suffix(".png").resolve() if screenshot else None
+            variants.append((format, output.resolve(), f"subtitles_{i}.ass", thumbnail))
+
+        encode.setdefault("threads", encoder_threads(len(variants)))
+        cmd = build_multi_format_command(
+            video.resolve(),
+            audio.resolve(),
+            variants,
+            start,
+            duration,
+            source_size,
+            screenshot=screenshot.resolve() if screenshot else None,
+            verbose=verbose,
+            **encode,
+        )
+        subprocess.run(cmd, cwd=workdir, check=True)
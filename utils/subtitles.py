@@ -0,0 +1,294 @@
+"""
+Subtitle rendering for the editor.
+
+Instead of building one moviepy TextClip per transcribed word, each word is
+rasterized once with PIL (cached in an LRU keyed by text and style) and drawn
+directly into the frames of a single subtitle layer.
+"""
+
+import math
+from bisect import bisect_right
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+# Maximum number of rendered word bitmaps kept in memory
+WORD_CACHE_SIZE = 2048
+
+
+class Word(NamedTuple):
+    start: float
+    end: float
+    text: str
+
+
+class WordIndex:
+    """
+    Sorted interval index over subtitle words.
+
+    Words are kept sorted by start time so the word active at a given time is
+    found with a binary search instead of a scan over every word.
+    """
+
+    def __init__(self, words: list[Word]):
+        self.words = sorted(words, key=lambda word: word.start)
+        self.starts = [word.start for word in self.words]
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def at(self, t: float) -> Word | None:
+        """Return the word displayed at time T, if any."""
+        i = bisect_right(self.starts, t) - 1
+        if i < 0:
+            return None
+        word = self.words[i]
+        return word if t < word.end else None
+
+
+@dataclass(frozen=True)
+class SubtitleStyle:
+    font: str
+    font_size: int = 42
+    color: str = "white"
+    stroke_color: str = "black"
+    stroke_width: int = 2
+
+
+@lru_cache(maxsize=16)
+def _load_font(font: str, font_size: int) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(font, font_size)
+
+
+def wrap_text(text: str, style: SubtitleStyle, max_width: int) -> list[str]:
+    """
+    Break TEXT at spaces into lines at most MAX_WIDTH pixels wide in STYLE.
+
+    A single word wider than MAX_WIDTH gets a line of its own.
+    """
+    font = _load_font(style.font, style.font_size)
+    lines: list[str] = []
+    for word in text.split():
+        candidate = f"{lines[-1]} {word}" if lines else word
+        if lines and font.getlength(candidate) + 2 * style.stroke_width <= max_width:
+            lines[-1] = candidate
+        else:
+            lines.append(word)
+    return lines or [text]
+
+
+@lru_cache(maxsize=WORD_CACHE_SIZE)
+def render_word(
+    text: str, style: SubtitleStyle, max_width: int | None = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Rasterize TEXT with STYLE.
+
+    Args:
+        text: The word to render
+        style: Font and colour settings
+        max_width: Width in pixels to wrap the text to, centering the lines
+
+    Returns:
+        Tuple of (rgb, alpha) float32 arrays shaped (h, w, 3) and (h, w, 1),
+        alpha in the 0-1 range, ready to be blended into a frame.
+    """
+    font = _load_font(style.font, style.font_size)
+    if max_width:
+        text = "\n".join(wrap_text(text, style, max_width))
+    measure = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+    left, top, right, bottom = measure.multiline_textbbox(
+        (0, 0), text, font=font, stroke_width=style.stroke_width, align="center"
+    )
+    # Centered lines can have fractional offsets
+    left, top, right, bottom = math.floor(left), math.floor(top), math.ceil(right), math.ceil(bottom)
+    width = max(right - left, 1)
+    height = max(bottom - top, 1)
+
+    image = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    draw.multiline_text(
+        (-left, -top),
+        text,
+        font=font,
+        fill=style.color,
+        stroke_width=style.stroke_width,
+        stroke_fill=style.stroke_color,
+        align="center",
+    )
+
+    pixels = np.asarray(image, dtype=np.float32)
+    rgb = pixels[:, :, :3]
+    alpha = pixels[:, :, 3:] / 255.0
+    # Cached arrays are shared between frames
+    rgb.flags.writeable = False
+    alpha.flags.writeable = False
+    return rgb, alpha
+
+
+def blend(frame: np.ndarray, rgb: np.ndarray, alpha: np.ndarray, x: int, y: int):
+    """Alpha-blend RGB/ALPHA into FRAME in place, with its top-left corner at (x, y)."""
+    frame_h, frame_w = frame.shape[:2]
+    h, w = alpha.shape[:2]
+
+    # Clip the bitmap to the frame bounds
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, frame_w), min(y + h, frame_h)
+    if x0 >= x1 or y0 >= y1:
+        return
+
+    src = (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x))
+    region = frame[y0:y1, x0:x1].astype(np.float32)
+    a = alpha[src]
+    region = region * (1.0 - a) + rgb[src] * a
+    frame[y0:y1, x0:x1] = region.astype(frame.dtype)
+
+
+class SubtitleRenderer:
+    """
+    Draws the active subtitle word into each frame of a clip.
+
+    Use with moviepy's `clip.transform(renderer)`.
+    """
+
+    def __init__(
+        self,
+        words: list[Word],
+        style: SubtitleStyle,
+        box_size: tuple[int, int],
+        position: str = "center",
+    ):
+        self.index = WordIndex(words)
+        self.style = style
+        self.box_size = box_size
+        self.position = position
+
+    def active_word(self, t: float) -> Word | None:
+        """Return the word displayed at time T, if any."""
+        return self.index.at(t)
+
+    def draw(self, frame: np.ndarray, t: float) -> np.ndarray:
+        """Return FRAME with the word active at time T drawn onto it."""
+        word = self.active_word(t)
+        if word is None:
+            return frame
+
+        rgb, alpha = render_word(word.text, self.style, self.box_size[0])
+        x, y = self._origin(frame.shape[1], frame.shape[0], alpha.shape[1], alpha.shape[0])
+
+        frame = frame.copy()
+        blend(frame, rgb, alpha, x, y)
+        return frame
+
+    def __call__(self, get_frame, t: float) -> np.ndarray:
+        return self.draw(get_frame(t), t)
+
+    def _origin(self, frame_w: int, frame_h: int, w: int, h: int) -> tuple[int, int]:
+        # Words are centered inside the subtitle box placed at POSITION
+        center_x, center_y = box_center((frame_w, frame_h), self.box_size, self.position)
+        return center_x - w // 2, center_y - h // 2
+
+
+def box_center(
+    frame_size: tuple[int, int], box_size: tuple[int, int], position: str = "center"
+) -> tuple[int, int]:
+    """Center point of the subtitle box placed at POSITION in a frame."""
+    frame_w, frame_h = frame_size
+    box_h = box_size[1]
+    if position == "top":
+        center_y = box_h // 2
+    elif position == "bottom":
+        center_y = frame_h - box_h + box_h // 2
+    else:
+        center_y = frame_h // 2
+    return frame_w // 2, center_y
+
+
+def _millisecond_timestamp(seconds: float, separator: str) -> str:
+    milliseconds = max(int(round(seconds * 1000)), 0)
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    secs, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{milliseconds:03d}"
+
+
+def srt_timestamp(seconds: float) -> str:
+    """Format SECONDS as an SRT timestamp (HH:MM:SS,mmm)."""
+    return _millisecond_timestamp(seconds, ",")
+
+
+def vtt_timestamp(seconds: float) -> str:
+    """Format SECONDS as a WebVTT timestamp (HH:MM:SS.mmm)."""
+    return _millisecond_timestamp(seconds, ".")
+
+
+def ass_timestamp(seconds: float) -> str:
+    """Format SECONDS as an ASS timestamp (H:MM:SS.cc)."""
+    centiseconds = max(int(round(seconds * 100)), 0)
+    hours, centiseconds = divmod(centiseconds, 360000)
+    minutes, centiseconds = divmod(centiseconds, 6000)
+    secs, centiseconds = divmod(centiseconds, 100)
+    return f"{hours}:{minutes:02d}:{secs:02d}.{centiseconds:02d}"
+
+
+def _ass_color(color: str) -> str:
+    red, green, blue = ImageColor.getrgb(color)[:3]
+    return f"&H00{blue:02X}{green:02X}{red:02X}"
+
+
+def _ass_escape(text: str) -> str:
+    # libass has no escapes for override braces or backslashes (a backslash
+    # before n, N or h is a line break or hard space), so these are replaced
+    # with their full-width forms
+    return text.replace("\\", "\uff3c").replace("{", "\uff5b").replace("}", "\uff5d")
+
+
+def write_ass(
+    words: list[Word],
+    path: Path,
+    style: SubtitleStyle,
+    frame_size: tuple[int, int],
+    box_size: tuple[int, int],
+    position: str = "center",
+):
+    """
+    Write WORDS as an ASS subtitle file for burning in with ffmpeg.
+
+    Each word becomes one event centered in the subtitle box and wrapped to
+    its width, matching the placement used by SubtitleRenderer.
+    """
+    font_name = _load_font(style.font, style.font_size).getname()[0]
+    x, y = box_center(frame_size, box_size, position)
+
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {frame_size[0]}",
+        f"PlayResY: {frame_size[1]}",
+        "ScaledBorderAndShadow: yes",
+        # Lines are broken by wrap_text, as for SubtitleRenderer
+        "WrapStyle: 2",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, "
+        "BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, "
+        "BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding",
+        f"Style: Default,{font_name},{style.font_size},{_ass_color(style.color)},"
+        f"{_ass_color(style.color)},{_ass_color(style.stroke_color)},&H00000000,"
+        f"0,0,0,0,100,100,0,0,1,{style.stroke_width},0,5,0,0,0,1",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+    ]
+    for word in sorted(words, key=lambda word: word.start):
+        lines.append(
+            f"Dialogue: 0,{ass_timestamp(word.start)},{ass_timestamp(word.end)},Default,,0,0,0,,"
+            f"{{\\an5\\pos({x},{y})}}"
+            + "\\N".join(_ass_escape(line) for line in wrap_text(word.text, style, box_size[0]))
+        )
+
+    Path(path).write_text("\n".join(lines) + "\n", encoding="utf-8")
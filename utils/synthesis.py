@@ -0,0 +1,365 @@
+"""
+Speech synthesis used by the `audio` command.
+
+Holds the Kokoro and Dia generation paths so a single invocation can
+synthesize one script or a whole batch while reusing the resident models.
+Long Kokoro narrations can be split into sentence chunks synthesized across a
+pool of worker processes, each holding its own pipeline.
+"""
+
+import json
+import multiprocessing
+import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, Optional
+
+import click
+import numpy as np
+import soundfile
+
+import dsp
+from models import get_dia_model, get_kokoro_pipeline
+from subtitles import Word
+from timings import timings_path, words_from_tokens, write_timings
+from tts_cache import TTSCache, get_tts_cache
+
+KOKORO_SAMPLE_RATE = 24000
+DIA_SAMPLE_RATE = 44100
+
+# Kokoro voices are prefixed with their language code (e.g. "af_sarah" -> "a")
+KOKORO_LANG_CODES = ("a", "b", "e", "f", "h", "i", "j", "p", "z")
+
+# Target size of the text chunks handed to pool workers
+PARALLEL_CHUNK_CHARS = 300
+
+# Process pools kept alive between calls, keyed by (workers, lang_code)
+_pools: dict[tuple[int, str], ProcessPoolExecutor] = {}
+
+
+def lang_code_for_voice(voice: str) -> str:
+    """Kokoro pipeline language code for VOICE."""
+    return voice[0] if voice and voice[0] in KOKORO_LANG_CODES else "a"
+
+
+def preprocess_text(text: str) -> str:
+    """Pre-process text for better TTS output."""
+    processed_text = text.replace("...", ". ")  # Convert ellipsis to pauses
+    processed_text = processed_text.replace("—", ", ")  # Convert em-dashes to commas
+    processed_text = processed_text.replace("–", ", ")  # Convert en-dashes to commas
+    return processed_text
+
+
+def split_sentences(text: str, max_chars: int = PARALLEL_CHUNK_CHARS) -> list[str]:
+    """
+    Split TEXT into chunks of whole sentences of roughly MAX_CHARS.
+
+    A sentence longer than MAX_CHARS becomes a chunk of its own.
+    """
+    sentences = [s for s in re.split(r"(?<=[.!?])\s+", text.strip()) if s]
+    chunks: list[str] = []
+    current = ""
+    for sentence in sentences:
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _init_pool_worker(lang_code: str):
+    import torch
+
+    # One thread per process; the pool provides the parallelism
+    torch.set_num_threads(1)
+    get_kokoro_pipeline(lang_code=lang_code, device="cpu")
+
+
+def _synthesize_chunk(
+    text: str, lang_code: str, voice: str, speed: float, word_timings: bool
+) -> tuple[np.ndarray, list[Word]]:
+    # Runs in a pool worker: returns the chunk's audio and its words relative
+    # to the start of the chunk
+    pipeline = get_kokoro_pipeline(lang_code=lang_code, device="cpu")
+    audio_parts = []
+    words = []
+    offset = 0.0
+    for result in pipeline(text, voice=voice, speed=speed):
+        audio = np.asarray(result.audio, dtype=np.float32)
+        if word_timings and result.tokens:
+            words.extend(words_from_tokens(result.tokens, offset))
+        audio_parts.append(audio)
+        offset += len(audio) / KOKORO_SAMPLE_RATE
+    audio = np.concatenate(audio_parts) if audio_parts else np.zeros(0, dtype=np.float32)
+    return audio, words
+
+
+def _get_pool(workers: int, lang_code: str) -> ProcessPoolExecutor:
+    key = (workers, lang_code)
+    if key not in _pools:
+        _pools[key] = ProcessPoolExecutor(
+            max_workers=workers,
+            # Spawn rather than fork: torch does not survive forking with threads
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_pool_worker,
+            initargs=(lang_code,),
+        )
+    return _pools[key]
+
+
+def _kokoro_chunks(
+    text: str,
+    voice: str,
+    speed: float,
+    word_timings: bool,
+    workers: int,
+    cache: Optional[TTSCache] = None,
+) -> Iterator[tuple[np.ndarray, list[Word]]]:
+    """
+    Yield (audio, relative words) for TEXT in output order.
+
+    With a CACHE, TEXT is synthesized sentence by sentence and sentences found
+    in the cache are yielded without invoking the model.
+    """
+    lang_code = lang_code_for_voice(voice)
+    if workers == 1 and cache is None:
+        pipeline = get_kokoro_pipeline(lang_code=lang_code, device="cpu")
+        for result in pipeline(text, voice=voice, speed=speed):
+            words = words_from_tokens(result.tokens) if word_timings and result.tokens else []
+            yield result.audio, words
+        return
+
+    chunks = split_sentences(text, max_chars=0 if cache else PARALLEL_CHUNK_CHARS)
+    pool = _get_pool(workers, lang_code) if workers > 1 else None
+    # Word timings are always kept for cached sentences so any later run can use them
+    keep_words = word_timings or cache is not None
+
+    # Hits are resolved right away, misses are submitted to the pool up front
+    # so workers run ahead while earlier chunks are written
+    pending = []
+    for chunk in chunks:
+        key = cache.key(chunk, voice, speed, "kokoro") if cache else None
+        hit = cache.get(key) if cache else None
+        if hit is not None:
+            pending.append((key, hit, None))
+        elif pool:
+            future = pool.submit(_synthesize_chunk, chunk, lang_code, voice, speed, keep_words)
+            pending.append((key, None, future))
+        else:
+            pending.append((key, None, None))
+
+    for chunk, (key, hit, future) in zip(chunks, pending):
+        if hit is not None:
+            audio, words = hit
+        else:
+            if future is not None:
+                audio, words = future.result()
+            else:
+                audio, words = _synthesize_chunk(chunk, lang_code, voice, speed, keep_words)
+            if cache:
+                cache.put(key, audio, words)
+        yield audio, words if word_timings else []
+
+
+def generate_dia_cached(text: str, use_cache: bool = True, verbose: bool = False) -> np.ndarray:
+    """
+    Generate TEXT with Dia, reusing the cached audio of an identical script.
+
+    Dia scripts are cached whole: splitting them would break speaker tags.
+    """
+    cache = get_tts_cache() if use_cache else None
+    key = cache.key(text, "default", 1.0, "dia") if cache else None
+    hit = cache.get(key) if cache else None
+    if hit is not None:
+        if verbose:
+            click.echo("Using cached Dia audio.")
+        return hit[0]
+
+    if verbose:
+        click.echo("Loading Dia model...")
+    model = get_dia_model()  # Loaded once and kept resident
+    if verbose:
+        click.echo("Generating audio with Dia...")
+    audio = model.generate(text)
+    if cache:
+        cache.put(key, audio)
+        cache.evict()
+    return audio
+
+
+def synthesize_dia(text: str, output: Path, use_cache: bool = True, verbose: bool = False):
+    """Generate OUTPUT from TEXT with the Dia model."""
+    dia_output = generate_dia_cached(text, use_cache=use_cache, verbose=verbose)
+    # Using 44100 sample rate as in your example.
+    soundfile.write(output.as_posix(), dia_output, DIA_SAMPLE_RATE)
+    # Dia has no word timings; drop those of an earlier Kokoro narration
+    timings_path(output).unlink(missing_ok=True)
+    if verbose:
+        click.echo(f"Successfully saved Dia audio to {output}")
+
+
+def synthesize_kokoro(
+    text: str,
+    output: Path,
+    voice: str = "af_sarah",
+    speed: float = 0.9,
+    normalize: bool = True,
+    compression: bool = False,
+    word_timings: bool = False,
+    workers: int = 1,
+    use_cache: bool = True,
+    loudness_target: Optional[float] = None,
+    verbose: bool = False,
+):
+    """
+    Generate OUTPUT from TEXT with Kokoro TTS, with optional post-processing.
+
+    With WORKERS > 1 the text is split into sentence chunks synthesized in
+    parallel by a process pool and written back in order. With USE_CACHE,
+    the text is synthesized sentence by sentence (which can change prosody
+    across sentence boundaries) and sentences already synthesized with the
+    same voice and speed are taken from the TTS cache. With LOUDNESS_TARGET (LUFS), the narration is
+    loudness-normalized and limited instead of peak-normalized.
+
+    Post-processing streams through a scratch file in two passes, so memory
+    use stays flat however long the narration is.
+    """
+    cache = get_tts_cache() if use_cache else None
+    processed_text = preprocess_text(text)
+
+    post_process = normalize or compression or loudness_target is not None
+
+    words = []
+    offset = 0.0  # Start of the current chunk in the output, in seconds
+    with tempfile.TemporaryDirectory() as workdir:
+        if post_process:
+            # First pass: chunks go to a scratch file while loudness and peak
+            # are measured; finish() applies the gain in a second pass
+            processor = dsp.StreamingPostProcessor(
+                KOKORO_SAMPLE_RATE,
+                Path(workdir),
+                normalize=normalize,
+                compression=compression,
+                loudness_target=loudness_target,
+            )
+            write = processor.feed
+        else:
+            # Nothing to post-process: stream chunks straight to the output
+            out = soundfile.SoundFile(output.as_posix(), "w", KOKORO_SAMPLE_RATE, 1)
+            write = out.write
+        try:
+            for audio_chunk, chunk_words in _kokoro_chunks(
+                processed_text, voice, speed, word_timings, workers, cache
+            ):
+                words.extend(
+                    Word(w.start + offset, w.end + offset, w.text) for w in chunk_words
+                )
+                audio_chunk = np.asarray(audio_chunk, dtype=np.float32)
+                write(audio_chunk)
+                offset += len(audio_chunk) / KOKORO_SAMPLE_RATE
+        finally:
+            if not post_process:
+                out.close()
+
+        if post_process:
+            if verbose:
+                click.echo("Applying audio post-processing...")
+            processor.finish(output)
+            if verbose:
+                if compression:
+                    click.echo("  ✓ Dynamic range compression applied")
+                if loudness_target is not None:
+                    click.echo(f"  ✓ Loudness normalized to {loudness_target} LUFS")
+                elif normalize:
+                    click.echo("  ✓ Audio normalized")
+
+    if cache:
+        cache.evict()
+
+    if word_timings:
+        write_timings(timings_path(output), words, output)
+        if verbose:
+            click.echo(f"  ✓ Word timings saved to {timings_path(output)}")
+    else:
+        # Timings of an earlier narration at this path no longer apply
+        timings_path(output).unlink(missing_ok=True)
+
+    if verbose:
+        click.echo(f"Successfully saved Kokoro TTS audio to {output}")
+
+
+def read_manifest(path: Path) -> list[dict]:
+    """
+    Read a batch manifest.
+
+    Each line is a JSON object with "text" and "output", and optionally
+    "id", "voice" and "speed". Blank lines are ignored.
+    """
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "text" not in entry or "output" not in entry:
+                raise click.UsageError(
+                    f"{path}:{line_number}: entries need 'text' and 'output'"
+                )
+            entry.setdefault("id", str(len(entries)))
+            entries.append(entry)
+    return entries
+
+
+def synthesize_batch(
+    entries: list[dict],
+    voice: str,
+    speed: float,
+    use_dia: bool = False,
+    verbose: bool = False,
+    **options,
+) -> Iterator[dict]:
+    """
+    Synthesize every manifest entry, yielding one result per entry.
+
+    VOICE and SPEED are defaults for entries that do not set their own.
+    Remaining OPTIONS are passed to synthesize_kokoro. Pipelines are shared
+    between entries of the same language through the model registry.
+    """
+    for index, entry in enumerate(entries):
+        output = Path(entry["output"])
+        started = time.perf_counter()
+        error = None
+        try:
+            if use_dia:
+                synthesize_dia(
+                    entry["text"],
+                    output,
+                    use_cache=options.get("use_cache", True),
+                    verbose=verbose,
+                )
+            else:
+                synthesize_kokoro(
+                    entry["text"],
+                    output,
+                    voice=entry.get("voice", voice),
+                    speed=float(entry.get("speed", speed)),
+                    verbose=verbose,
+                    **options,
+                )
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+
+        yield {
+            "id": entry["id"],
+            "ok": error is None,
+            "output": output.as_posix(),
+            "error": error,
+            "elapsed": round(time.perf_counter() - started, 3),
+            "index": index + 1,
+            "total": len(entries),
+        }
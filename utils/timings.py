@@ -0,0 +1,107 @@
+"""
+Word timing sidecar files.
+
+The `audio` command knows exactly which words it synthesized and when: Kokoro
+yields per-token timestamps for every chunk. Writing them next to the audio
+lets the editor build subtitles without running Whisper on the narration.
+
+The sidecar records a hash of the audio it was written for, so a narration
+regenerated without word timings (or by another engine) never picks up the
+words of an earlier one.
+
+Sidecar format (JSON):
+    {"version": 2, "source": "kokoro", "audio_hash": "<sha1>",
+     "words": [{"start": 0.0, "end": 0.31, "text": "Hello,"}, ...]}
+"""
+
+import json
+from pathlib import Path
+from typing import Iterable, Optional
+
+from cache import file_hash
+from subtitles import Word
+
+TIMINGS_VERSION = 2
+TIMINGS_SUFFIX = ".words.json"
+
+
+def timings_path(audio: Path) -> Path:
+    """Sidecar path for the word timings of AUDIO."""
+    return audio.with_name(audio.stem + TIMINGS_SUFFIX)
+
+
+def words_from_tokens(tokens: Iterable, offset: float = 0.0) -> list[Word]:
+    """
+    Build subtitle words from Kokoro tokens.
+
+    Tokens not followed by whitespace are joined with the next one, and
+    punctuation-only tokens are attached to the preceding word, so the result
+    reads like Whisper's word output ("Hello," rather than "Hello" + ",").
+
+    Args:
+        tokens: Kokoro MToken objects of one chunk
+        offset: Start of the chunk in the output audio, in seconds
+
+    Returns:
+        Words with absolute timestamps
+    """
+    words: list[Word] = []
+    text, start, end = "", None, None
+
+    def flush():
+        nonlocal text, start, end
+        if text.strip() and start is not None and end is not None:
+            words.append(Word(offset + start, offset + end, text.strip()))
+        text, start, end = "", None, None
+
+    for token in tokens:
+        token_text = token.text or ""
+        has_timing = token.start_ts is not None and token.end_ts is not None
+
+        if not any(c.isalnum() for c in token_text):
+            # Punctuation: attach to the word being built or the last one
+            if text:
+                text += token_text
+            elif words:
+                words[-1] = words[-1]._replace(text=words[-1].text + token_text)
+        else:
+            text += token_text
+            if has_timing:
+                start = token.start_ts if start is None else start
+                end = token.end_ts
+
+        if token.whitespace:
+            flush()
+    flush()
+    return words
+
+
+def write_timings(path: Path, words: list[Word], audio: Path, source: str = "kokoro"):
+    """Write WORDS of AUDIO to the sidecar at PATH."""
+    data = {
+        "version": TIMINGS_VERSION,
+        "source": source,
+        "audio_hash": file_hash(audio),
+        "words": [
+            {"start": round(w.start, 3), "end": round(w.end, 3), "text": w.text}
+            for w in words
+        ],
+    }
+    Path(path).write_text(json.dumps(data), encoding="utf-8")
+
+
+def read_timings(path: Path, audio: Optional[Path] = None) -> Optional[list[Word]]:
+    """
+    Read words from the sidecar at PATH.
+
+    With AUDIO, returns None unless the sidecar was written for exactly that
+    audio (and by this version).
+    """
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    if audio is not None and (
+        data.get("version") != TIMINGS_VERSION or data.get("audio_hash") != file_hash(audio)
+    ):
+        return None
+    if data.get("version") != TIMINGS_VERSION:
+        raise ValueError(f"Unsupported timings version: {data.get('version')}")
+    return [Word(w["start"], w["end"], w["text"]) for w in data["words"]]
@@ -0,0 +1,117 @@
+"""
+On-disk cache of Whisper transcriptions.
+
+`transcribe` and `editor` run Whisper on the same narration files, and a
+render retried after a failed encode would otherwise transcribe again.
+Results are stored under a hash of the full audio content and every setting
+that changes the output (model size, compute type, language, chunk length,
+temperature, VAD settings and whether word timestamps were requested).
+
+Entries are gzipped JSON with segments and words stored as arrays:
+    {"version": 1, "info": [language, probability, duration],
+     "segments": [[start, end, text, [[start, end, word], ...]], ...]}
+"""
+
+import gzip
+import hashlib
+import json
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from cache import CACHE_DIR as BASE_CACHE_DIR
+from cache import file_hash, replacing
+from subtitles import Word
+
+CACHE_DIR = BASE_CACHE_DIR / "transcripts"
+TRANSCRIPT_CACHE_VERSION = 1
+
+
+class Segment(NamedTuple):
+    start: float
+    end: float
+    text: str
+    words: tuple[Word, ...] = ()
+
+
+class TranscriptInfo(NamedTuple):
+    language: str
+    language_probability: float
+    duration: float
+
+
+class TranscriptCache:
+    """Disk-backed cache of transcriptions keyed by audio content and settings."""
+
+    def __init__(self, directory: Path = CACHE_DIR):
+        self.directory = Path(directory)
+
+    def key(
+        self,
+        audio: Path,
+        model_size: str,
+        compute_type: str,
+        language: Optional[str],
+        chunk_length: Optional[int],
+        word_timestamps: bool,
+        temperature: Optional[float] = None,
+        vad: Optional[list] = None,
+    ) -> str:
+        """Cache key of AUDIO transcribed with the given settings (VAD included)."""
+        payload = json.dumps(
+            [
+                # The whole file: sampled hashes can collide on long narrations
+                file_hash(audio),
+                model_size,
+                compute_type,
+                language,
+                chunk_length,
+                word_timestamps,
+                temperature,
+                vad,
+            ]
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json.gz"
+
+    def get(self, key: str) -> Optional[tuple[list[Segment], TranscriptInfo]]:
+        """Return (segments, info) stored under KEY, or None on a miss."""
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, ValueError, zlib.error):
+            # Truncated or corrupt: transcribe again and let put replace it
+            path.unlink(missing_ok=True)
+            return None
+        if data.get("version") != TRANSCRIPT_CACHE_VERSION:
+            return None
+        segments = [
+            Segment(start, end, text, tuple(Word(*w) for w in words))
+            for start, end, text, words in data["segments"]
+        ]
+        return segments, TranscriptInfo(*data["info"])
+
+    def put(self, key: str, segments: list[Segment], info: TranscriptInfo):
+        """Store the complete transcription SEGMENTS and INFO under KEY."""
+        data = {
+            "version": TRANSCRIPT_CACHE_VERSION,
+            "info": list(info),
+            "segments": [
+                [s.start, s.end, s.text, [list(w) for w in s.words]] for s in segments
+            ],
+        }
+        with replacing(self._path(key)) as partial:
+            with gzip.open(partial, "wt", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+
+
+@lru_cache(maxsize=1)
+def get_transcript_cache() -> TranscriptCache:
+    """Process-wide transcript cache."""
+    return TranscriptCache(CACHE_DIR)
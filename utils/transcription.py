@@ -0,0 +1,290 @@
+"""
+Whisper transcription shared by the `transcribe` and `editor` commands.
+
+Wraps the batched faster-whisper pipeline so segments are yielded as they
+are decoded and complete runs are stored in the transcript cache, and formats
+segments incrementally as JSON lines, SRT or WebVTT.
+
+Audio is cut into speech chunks of up to CHUNK_LENGTH seconds before batching,
+with faster-whisper's Silero VAD or the energy detector in vad.py, so
+silences are skipped instead of transcribed.
+"""
+
+import json
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+import click
+
+import vad as energy_vad
+from align import align_words
+from models import get_whisper_pipeline
+from subtitles import Word, srt_timestamp, vtt_timestamp
+from timings import read_timings, timings_path
+from transcript_cache import Segment, TranscriptInfo, get_transcript_cache
+
+# Whisper's input window: chunks up to this long fill batches best
+DEFAULT_CHUNK_LENGTH = 30
+VAD_METHODS = ("silero", "energy", "off")
+
+
+def _segments(whisper_segments, word_timestamps: bool) -> Iterator[Segment]:
+    for segment in whisper_segments:
+        words = ()
+        if word_timestamps:
+            words = tuple(
+                Word(word.start, word.end, word.word.strip())
+                for word in (segment.words or [])
+                if word.word.strip()
+            )
+        yield Segment(segment.start, segment.end, segment.text.strip(), words)
+
+
+def _store(segments: Iterator[Segment], key: str, info: TranscriptInfo) -> Iterator[Segment]:
+    # Only a run that was consumed to the end is cached
+    collected = []
+    for segment in segments:
+        collected.append(segment)
+        yield segment
+    get_transcript_cache().put(key, collected, info)
+
+
+def transcribe_audio(
+    audio: Path,
+    model_size: str,
+    device: str = "cpu",
+    compute_type: str = "int8",
+    batch_size: int = 16,
+    chunk_length: int = DEFAULT_CHUNK_LENGTH,
+    temperature: Optional[float] = None,
+    language: Optional[str] = None,
+    word_timestamps: bool = False,
+    vad: str = "silero",
+    vad_threshold: Optional[float] = None,
+    min_silence_ms: Optional[int] = None,
+    use_cache: bool = True,
+) -> tuple[Iterator[Segment], TranscriptInfo]:
+    """
+    Transcribe AUDIO with Whisper.
+
+    Like faster-whisper, returns a lazy iterator of segments together with
+    the transcription info; segments are decoded while iterating. With
+    USE_CACHE, an identical earlier run is returned without loading the
+    model.
+
+    Args:
+        audio: Audio file to transcribe
+        model_size: Whisper model size
+        device: Device to run the model on
+        compute_type: CTranslate2 compute type
+        batch_size: Batch size for inference
+        chunk_length: Maximum length of the speech chunks fed to the model, in seconds
+        temperature: Sampling temperature, or None for faster-whisper's fallback schedule
+        language: Language code, or None to detect it
+        word_timestamps: Whether segments include their words
+        vad: Speech detection method: "silero", "energy" or "off" (fixed chunks)
+        vad_threshold: Silero speech probability, or energy level in dB below
+            the loudest frame; None for the method's default
+        min_silence_ms: Shortest silence that separates speech regions
+        use_cache: Whether to consult and fill the transcript cache
+
+    Returns:
+        Tuple of (segments, info)
+    """
+    cache = get_transcript_cache() if use_cache else None
+    key = (
+        cache.key(
+            audio,
+            model_size,
+            compute_type,
+            language,
+            chunk_length,
+            word_timestamps,
+            temperature,
+            vad=[vad, vad_threshold, min_silence_ms],
+        )
+        if cache
+        else None
+    )
+    hit = cache.get(key) if cache else None
+    if hit is not None:
+        segments, info = hit
+        return iter(segments), info
+
+    options = {} if temperature is None else {"temperature": temperature}
+    source = audio.as_posix()
+    if vad == "silero":
+        vad_parameters = {}
+        if vad_threshold is not None:
+            vad_parameters["threshold"] = vad_threshold
+        if min_silence_ms is not None:
+            vad_parameters["min_silence_duration_ms"] = min_silence_ms
+        # The pipeline merges speech up to chunk_length itself
+        options.update(vad_filter=True, vad_parameters=vad_parameters or None)
+    else:
+        from faster_whisper import decode_audio
+
+        source = decode_audio(source, sampling_rate=energy_vad.SAMPLE_RATE)
+        if vad == "energy":
+            regions = energy_vad.speech_regions(
+                source,
+                threshold_db=energy_vad.DEFAULT_THRESHOLD_DB if vad_threshold is None else vad_threshold,
+                min_silence_ms=energy_vad.DEFAULT_MIN_SILENCE_MS if min_silence_ms is None else min_silence_ms,
+            )
+            chunks = energy_vad.merge_regions(regions, chunk_length)
+        else:
+            chunks = energy_vad.fixed_chunks(len(source) / energy_vad.SAMPLE_RATE, chunk_length)
+        # The batched pipeline takes clip timestamps in samples, not seconds
+        options.update(
+            vad_filter=False,
+            clip_timestamps=[
+                {
+                    "start": int(start * energy_vad.SAMPLE_RATE),
+                    "end": int(end * energy_vad.SAMPLE_RATE),
+                }
+                for start, end in chunks
+            ],
+        )
+
+    pipeline = get_whisper_pipeline(model_size, device, compute_type)
+    whisper_segments, whisper_info = pipeline.transcribe(
+        source,
+        batch_size=batch_size,
+        chunk_length=chunk_length,
+        language=language,
+        word_timestamps=word_timestamps,
+        **options,
+    )
+    info = TranscriptInfo(
+        whisper_info.language, whisper_info.language_probability, whisper_info.duration
+    )
+    segments = _segments(whisper_segments, word_timestamps)
+    if cache:
+        segments = _store(segments, key, info)
+    return segments, info
+
+
+def transcribe_words(
+    audio: Path,
+    model_size: str,
+    device: str,
+    compute_type: str,
+    batch_size: int,
+    verbose: bool = False,
+    use_cache: bool = True,
+    **options,
+) -> list[Word]:
+    """
+    Transcribe AUDIO with Whisper and return its words with timestamps.
+
+    Remaining OPTIONS (chunking and VAD settings) are passed to transcribe_audio.
+    """
+    if verbose:
+        click.echo(f"Transcribing audio file: {audio}...")
+    segments, info = transcribe_audio(
+        audio,
+        model_size,
+        device,
+        compute_type,
+        batch_size,
+        word_timestamps=True,
+        use_cache=use_cache,
+        **options,
+    )
+    subtitle_words = [word for segment in segments for word in segment.words]
+    if verbose:
+        click.echo(
+            f"Transcription complete. Language: {info.language} (Prob: {info.language_probability:.2f}), Duration: {info.duration:.2f}s"
+        )
+    return subtitle_words
+
+
+def resolve_subtitle_words(
+    audio: Path,
+    model_size: str,
+    device: str,
+    compute_type: str,
+    batch_size: int,
+    timings: Optional[Path] = None,
+    text: Optional[str] = None,
+    verbose: bool = False,
+    use_cache: bool = True,
+    **options,
+) -> list[Word]:
+    """
+    Words of AUDIO with timestamps, for subtitles.
+
+    Prefers the word timings written by the audio command for this exact
+    audio (TIMINGS, by default the sidecar next to AUDIO), then forced alignment of the known
+    script TEXT, and only transcribes with Whisper as a last resort.
+    Remaining OPTIONS are passed to transcribe_words.
+    """
+    timings_file = timings or timings_path(audio)
+    if timings_file.exists():
+        words = read_timings(timings_file, audio)
+        if words is not None:
+            if verbose:
+                click.echo(f"Using word timings from {timings_file}, skipping transcription.")
+            return words
+        click.echo(
+            f"Warning: ignoring {timings_file}, it was written for a different audio file.",
+            err=True,
+        )
+    if text:
+        if verbose:
+            click.echo("Aligning script to audio...")
+        try:
+            return align_words(audio, text, device=device)
+        except ImportError:
+            click.echo(
+                "Warning: forced alignment requires torchaudio, falling back to transcription. Install with: pip install torchaudio",
+                err=True,
+            )
+    return transcribe_words(
+        audio,
+        model_size,
+        device,
+        compute_type,
+        batch_size,
+        verbose,
+        use_cache=use_cache,
+        **options,
+    )
+
+
+OUTPUT_FORMATS = ("text", "jsonl", "srt", "vtt")
+
+
+def format_segments(segments: Iterable[Segment], format: str) -> Iterator[str]:
+    """
+    Format SEGMENTS as FORMAT, yielding one block of text per segment.
+
+    Blocks are produced as segments arrive, so output can be consumed before
+    transcription finishes. Blocks do not end with a newline.
+    """
+    if format == "vtt":
+        yield "WEBVTT\n"
+    for index, segment in enumerate(segments, start=1):
+        if format == "text":
+            yield f"[{segment.start:.2f}s -> {segment.end:.2f}s] {segment.text}"
+        elif format == "jsonl":
+            yield json.dumps(
+                {
+                    "start": round(segment.start, 3),
+                    "end": round(segment.end, 3),
+                    "text": segment.text,
+                    "words": [
+                        {"start": round(w.start, 3), "end": round(w.end, 3), "text": w.text}
+                        for w in segment.words
+                    ],
+                }
+            )
+        elif format == "srt":
+            yield (
+                f"{index}\n{srt_timestamp(segment.start)} --> {srt_timestamp(segment.end)}\n"
+                f"{segment.text}\n"
+            )
+        elif format == "vtt":
+            yield f"{vtt_timestamp(segment.start)} --> {vtt_timestamp(segment.end)}\n{segment.text}\n"
+        else:
+            raise ValueError(f"Unknown output format: {format}")
@@ -0,0 +1,134 @@
+"""
+Content-addressed cache of synthesized speech.
+
+Intros, outros, hooks and titles recur across videos. Each synthesized
+sentence is stored on disk under a hash of (normalized text, voice, speed,
+engine, model version), so repeated sentences are concatenated from the cache
+without invoking the model. The cache is bounded in size and evicts the least
+recently used entries first.
+
+The size limit is read from TTS_CACHE_MAX_MB (default 1024).
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+from functools import lru_cache
+from importlib import metadata
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from subtitles import Word
+
+CACHE_DIR = Path(__file__).parent.parent / "media" / "cache" / "tts"
+DEFAULT_MAX_MB = 1024
+
+
+@lru_cache(maxsize=None)
+def model_version(package: str) -> str:
+    """Installed version of the PACKAGE implementing an engine."""
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different sentences share an entry."""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class TTSCache:
+    """Disk-backed, size-bounded cache of synthesized audio and word timings."""
+
+    def __init__(self, directory: Path = CACHE_DIR, max_bytes: Optional[int] = None):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def key(self, text: str, voice: str, speed: float, engine: str) -> str:
+        """Cache key of TEXT spoken by VOICE at SPEED with ENGINE."""
+        payload = json.dumps(
+            [normalize_text(text), voice, round(speed, 3), engine, model_version(engine)]
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.npz"
+
+    def get(self, key: str) -> Optional[tuple[np.ndarray, list[Word]]]:
+        """Return (audio, words) stored under KEY, or None on a miss."""
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                audio = data["audio"]
+                words = [Word(*w) for w in json.loads(str(data["words"]))]
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # A corrupt entry (e.g. truncated by a full disk) would fail every
+            # later lookup: treat it as a miss and let the next put replace it
+            path.unlink(missing_ok=True)
+            return None
+        # Mark as recently used for eviction; another process may have just
+        # evicted the entry, which leaves the audio already read intact
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return audio, words
+
+    def put(self, key: str, audio: np.ndarray, words: Optional[list[Word]] = None):
+        """
+        Store AUDIO and its WORDS (relative to the start of AUDIO) under KEY.
+
+        Call evict() once a batch of puts is done to enforce the size limit.
+        """
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # A name of its own: other processes may be storing the same sentence
+        fd, partial = tempfile.mkstemp(dir=path.parent, prefix=f"{key}.", suffix=".partial.npz")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    audio=np.asarray(audio, dtype=np.float32),
+                    words=np.array(json.dumps([list(w) for w in (words or [])])),
+                )
+            os.replace(partial, path)
+        except BaseException:
+            Path(partial).unlink(missing_ok=True)
+            raise
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        if self.max_bytes is None:
+            return
+        entries = []
+        total = 0
+        for path in self.directory.glob("*/*.npz"):
+            if path.name.endswith(".partial.npz"):
+                continue  # Being written
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # Evicted by another process
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            path.unlink(missing_ok=True)
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+
+@lru_cache(maxsize=1)
+def get_tts_cache() -> TTSCache:
+    """Process-wide TTS cache configured from the environment."""
+    max_mb = float(os.environ.get("TTS_CACHE_MAX_MB", DEFAULT_MAX_MB))
+    return TTSCache(CACHE_DIR, max_bytes=int(max_mb * 1024 * 1024))
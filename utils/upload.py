@@ -1,20 +1,20 @@
 #!/usr/bin/env python3
 
 import argparse
+import asyncio
+import hashlib
 import http.client
-import httplib2
+import json
 import os
 import random
 import sys
 import time
 import pickle
+from pathlib import Path
 
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-from googleapiclient.http import MediaFileUpload
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
+# The Google client libraries take a large share of startup time, so they are
+# imported by the functions that need them: argument parsing, file checks and
+# progress setup run without them.
 
 # Explicitly tell the underlying HTTP transport library not to retry, since
 # we are handling retry logic ourselves.
@@ -25,8 +25,8 @@ MAX_RETRIES = 10
 
 # Always retry when these exceptions are raised.
 # Updated for Python 3 and google-api-python-client
+# httplib2.HttpLib2Error is added by retriable_exceptions() on first use.
 RETRIABLE_EXCEPTIONS = (
-    httplib2.HttpLib2Error,  # Keep if httplib2 is still used under the hood
     IOError,  # Generally replaced by OSError in Python 3
     OSError,
     http.client.NotConnected,
@@ -42,6 +42,13 @@ RETRIABLE_EXCEPTIONS = (
 # codes is raised.
 RETRIABLE_STATUS_CODES = [500, 502, 503, 504]
 
+# Errors meaning every upload should slow down, and errors meaning no upload
+# can succeed until the daily quota resets
+RATE_LIMIT_REASONS = ("rateLimitExceeded", "userRateLimitExceeded")
+QUOTA_REASONS = ("quotaExceeded", "dailyLimitExceeded", "uploadLimitExceeded")
+
+DEFAULT_CONCURRENCY = 3
+
 # The CLIENT_SECRETS_FILE variable specifies the name of a file that contains
 # the OAuth 2.0 information for this application, including its client_id and
 # client_secret. You can acquire an OAuth 2.0 client ID and client secret from
@@ -59,8 +66,125 @@ YOUTUBE_API_VERSION = "v3"
 
 VALID_PRIVACY_STATUSES = ("public", "private", "unlisted")
 
+# The discovery document is pinned to the copy cached here: the first run
+# seeds it from the document bundled with google-api-python-client (no network
+# needed) and it only changes when refreshed with --refresh-discovery.
+DISCOVERY_CACHE_DIR = Path(__file__).parent.parent / "media" / "cache" / "discovery"
+DISCOVERY_URL = "https://www.googleapis.com/discovery/v1/apis/{api}/{version}/rest"
+
+# Resumable upload chunks must be a multiple of 256 KiB (except the last one)
+CHUNK_ALIGNMENT = 256 * 1024
+DEFAULT_CHUNK_SIZE_MB = 8
+
+# Resumable session URIs are kept here so an interrupted upload continues
+# from the last acknowledged byte when the script is run again. YouTube
+# expires sessions after about a week.
+SESSION_DIR = Path(__file__).parent.parent / "media" / "cache" / "uploads"
+SESSION_MAX_AGE = 6 * 24 * 3600
+
+
+def chunk_size_bytes(megabytes):
+    """Chunk size in bytes for MEGABYTES, rounded to the 256 KiB the API requires."""
+    chunks = max(round(megabytes * 1024 * 1024 / CHUNK_ALIGNMENT), 1)
+    return chunks * CHUNK_ALIGNMENT
+
+
+class ProgressReporter:
+    """Reports upload events as text or as JSON lines on stdout."""
+
+    def __init__(self, file, json_output=False):
+        self.file = file
+        self.json_output = json_output
+
+    def emit(self, event, message=None, **fields):
+        if self.json_output:
+            print(json.dumps({"event": event, "file": self.file, **fields}), flush=True)
+        elif message:
+            print(message, flush=True)
+
+    def progress(self, uploaded, total):
+        percent = 100.0 * uploaded / total if total else 100.0
+        self.emit(
+            "progress",
+            f"Uploaded {uploaded} of {total} bytes ({percent:.1f}%)",
+            bytes=uploaded,
+            total=total,
+            percent=round(percent, 2),
+        )
+
+
+def upload_session_path(file, body):
+    """Where the resumable session of FILE uploaded with metadata BODY is kept."""
+    stat = os.stat(file)
+    key = json.dumps(
+        [os.path.abspath(file), stat.st_size, stat.st_mtime_ns, body], sort_keys=True
+    )
+    return SESSION_DIR / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.json"
+
+
+def load_session(path):
+    """Saved resumable session URI at PATH, or None if missing or expired."""
+    try:
+        session = json.loads(path.read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+    if time.time() - session.get("created", 0) > SESSION_MAX_AGE:
+        path.unlink(missing_ok=True)
+        return None
+    return session.get("uri")
+
+
+def save_session(path, uri):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"uri": uri, "created": time.time()}))
+
+
+def retriable_exceptions():
+    """RETRIABLE_EXCEPTIONS plus the transport's own errors."""
+    import httplib2
+
+    return RETRIABLE_EXCEPTIONS + (httplib2.HttpLib2Error, http.client.HTTPException)
+
+
+def discovery_document_path():
+    return DISCOVERY_CACHE_DIR / f"{YOUTUBE_API_SERVICE_NAME}.{YOUTUBE_API_VERSION}.json"
+
+
+def _download_discovery_document():
+    import urllib.request
+
+    url = DISCOVERY_URL.format(api=YOUTUBE_API_SERVICE_NAME, version=YOUTUBE_API_VERSION)
+    with urllib.request.urlopen(url, timeout=30) as response:
+        return response.read().decode("utf-8")
+
+
+def discovery_document(refresh=False):
+    """The pinned YouTube discovery document, cached on disk."""
+    path = discovery_document_path()
+    if not refresh:
+        try:
+            return path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            pass
 
-def get_authenticated_service():
+    document = None
+    if not refresh:
+        from googleapiclient.discovery_cache import get_static_doc
+
+        document = get_static_doc(YOUTUBE_API_SERVICE_NAME, YOUTUBE_API_VERSION)
+    if document is None:
+        document = _download_discovery_document()
+
+    if json.loads(document).get("version") != YOUTUBE_API_VERSION:
+        raise ValueError(f"Discovery document is not for {YOUTUBE_API_VERSION}")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_suffix(".partial")
+    partial.write_text(document, encoding="utf-8")
+    os.replace(partial, path)
+    return document
+
+
+def get_credentials():
     credentials = None
     # The file token.pickle stores the user's access and refresh tokens, and is
     # created automatically when the authorization flow completes for the first
@@ -72,10 +196,14 @@ def get_authenticated_service():
     # If there are no (valid) credentials available, let the user log in.
     if not credentials or not credentials.valid:
         if credentials and credentials.expired and credentials.refresh_token:
+            from google.auth.transport.requests import Request
+
             try:
                 credentials.refresh(Request())
             except Exception as e:
                 print(f"Error refreshing token: {e}")
+                from google_auth_oauthlib.flow import InstalledAppFlow
+
                 # Fallback to re-running the flow
                 flow = InstalledAppFlow.from_client_secrets_file(
                     CLIENT_SECRETS_FILE, scopes=YOUTUBE_UPLOAD_SCOPE
@@ -90,6 +218,8 @@ def get_authenticated_service():
                 )
                 sys.exit(0)
 
+            from google_auth_oauthlib.flow import InstalledAppFlow
+
             flow = InstalledAppFlow.from_client_secrets_file(
                 CLIENT_SECRETS_FILE, scopes=YOUTUBE_UPLOAD_SCOPE
             )
@@ -104,10 +234,144 @@ def get_authenticated_service():
             pickle.dump(credentials, token)
             print(f"Credentials saved to {TOKEN_PICKLE_FILE}")
 
-    return build(YOUTUBE_API_SERVICE_NAME, YOUTUBE_API_VERSION, credentials=credentials)
+    return credentials
+
+
+def get_authenticated_service(credentials=None, refresh_discovery=False):
+    from googleapiclient.discovery import build_from_document
+
+    if credentials is None:
+        credentials = get_credentials()
+    # Built from the cached document: no discovery request on every run
+    return build_from_document(
+        discovery_document(refresh=refresh_discovery), credentials=credentials
+    )
+
+
+class RetryPolicy:
+    """How often and how long to back off for one class of errors."""
+
+    def __init__(self, max_retries, base_delay, max_delay, pause_all=False):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # Whether the error concerns the API as a whole rather than one upload
+        self.pause_all = pause_all
+
+    def delay(self, attempt):
+        """Full-jitter exponential backoff for the ATTEMPT-th retry (from 1)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
 
 
-def initialize_upload(youtube, options):
+RETRY_POLICIES = {
+    # RETRIABLE_STATUS_CODES
+    "server": RetryPolicy(MAX_RETRIES, 0.5, 64),
+    # RETRIABLE_EXCEPTIONS
+    "network": RetryPolicy(MAX_RETRIES, 0.5, 32),
+    # RATE_LIMIT_REASONS: slow every upload down
+    "rate_limit": RetryPolicy(MAX_RETRIES, 2, 300, pause_all=True),
+    # A saved resumable session the server no longer knows: start over once
+    "session_expired": RetryPolicy(1, 0, 0),
+}
+
+
+class UploadResult:
+    """Outcome of one upload."""
+
+    def __init__(self, file, video_id=None, error=None, error_class=None, attempts=0, elapsed=0.0):
+        self.file = file
+        self.video_id = video_id
+        self.error = error
+        self.error_class = error_class
+        self.attempts = attempts
+        self.elapsed = elapsed
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def to_dict(self):
+        return {
+            "file": self.file,
+            "ok": self.ok,
+            "video_id": self.video_id,
+            "error": self.error,
+            "error_class": self.error_class,
+            "attempts": self.attempts,
+            "elapsed": round(self.elapsed, 3),
+        }
+
+
+class BackoffScheduler:
+    """
+    Schedules retries of concurrent uploads on one event loop.
+
+    Backoff waits are asyncio sleeps, so other uploads (and anything else on
+    the loop) keep running while one upload waits. Errors whose policy
+    concerns the whole API pause every upload, and once the daily quota is
+    exhausted no further chunk is sent.
+    """
+
+    def __init__(self, policies=None):
+        self.policies = policies or RETRY_POLICIES
+        self._resume_at = 0.0
+        self.quota_exhausted = False
+
+    def pause(self, seconds):
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+    async def wait(self):
+        while True:
+            delay = self._resume_at - time.monotonic()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+
+def _error_reason(error):
+    # The first reason of the API error body, e.g. "quotaExceeded"
+    try:
+        return json.loads(error.content)["error"]["errors"][0]["reason"]
+    except (ValueError, KeyError, IndexError, TypeError):
+        return None
+
+
+def classify_error(error, resumed=False):
+    """
+    Name of the RETRY_POLICIES entry for ERROR, "quota" when the daily quota
+    is exhausted, or None if it is not retriable.
+    """
+    from googleapiclient.errors import HttpError
+
+    if isinstance(error, HttpError):
+        status = error.resp.status
+        reason = _error_reason(error)
+        if resumed and status in (404, 410):
+            return "session_expired"
+        if status in RETRIABLE_STATUS_CODES:
+            return "server"
+        if status in (403, 429) and reason in RATE_LIMIT_REASONS:
+            return "rate_limit"
+        if reason in QUOTA_REASONS:
+            return "quota"
+        return None
+    if isinstance(error, retriable_exceptions()):
+        return "network"
+    return None
+
+
+def _describe(error):
+    from googleapiclient.errors import HttpError
+
+    if isinstance(error, HttpError):
+        return f"HTTP {error.resp.status}: {_error_reason(error) or error.content!r}"
+    return f"{type(error).__name__}: {error}"
+
+
+def build_upload_request(youtube, options):
+    """Build the videos.insert request for OPTIONS and its metadata body."""
+    from googleapiclient.http import MediaFileUpload
+
     tags = None
     if options.keywords:
         tags = options.keywords.split(",")
@@ -123,61 +387,241 @@ def initialize_upload(youtube, options):
     )
 
     # Call the API's videos.insert method to create and upload the video.
-    media_body = MediaFileUpload(options.file, chunksize=-1, resumable=True)
+    # Uploading in chunks means a dropped connection only costs one chunk.
+    media_body = MediaFileUpload(
+        options.file, chunksize=chunk_size_bytes(options.chunk_size), resumable=True
+    )
 
     insert_request = youtube.videos().insert(
         part=",".join(body.keys()), body=body, media_body=media_body
     )
+    return insert_request, body
+
+
+async def initialize_upload(youtube, options, connection=None, scheduler=None):
+    """Upload the video described by OPTIONS and return its UploadResult."""
+    reporter = ProgressReporter(options.file, json_output=options.progress == "json")
+    if not os.path.exists(options.file):
+        reporter.emit("error", f"File not found: {options.file}", error="File not found")
+        return UploadResult(options.file, error=f"File not found: {options.file}")
+    insert_request, body = build_upload_request(youtube, options)
+    session_path = upload_session_path(options.file, body) if options.resume else None
+    deadline = getattr(options, "deadline", None)
+    return await resumable_upload(
+        insert_request,
+        reporter,
+        session_path,
+        connection=connection,
+        scheduler=scheduler,
+        deadline=time.monotonic() + deadline if deadline else None,
+    )
+
+
+def _resume_session(request, session_path, reporter):
+    # Point the request at the saved session; being "in an error state" makes
+    # the client ask the server for the acknowledged offset before sending
+    uri = load_session(session_path)
+    if uri is None:
+        return None
+    request.resumable_uri = uri
+    request.resumable_progress = 0
+    request._in_error_state = True
+    reporter.emit("resume", "Resuming interrupted upload...", uri=uri)
+    return uri
+
 
-    resumable_upload(insert_request)
+def _restart_session(request):
+    request.resumable_uri = None
+    request.resumable_progress = 0
+    request._in_error_state = False
 
 
-# This method implements an exponential backoff strategy to resume a
-# failed upload.
-def resumable_upload(request):
-    response = None
-    error = None
-    retry = 0
-    while response is None:
+# This coroutine implements an exponential backoff strategy to resume a
+# failed upload. Chunks are sent from a worker thread and backoff waits are
+# scheduled on the event loop, so concurrent uploads keep going meanwhile.
+# CONNECTION is the authorized HTTP connection to send chunks on and
+# DEADLINE (time.monotonic()) bounds the whole upload including retries.
+async def resumable_upload(
+    request, reporter=None, session_path=None, connection=None, scheduler=None, deadline=None
+):
+    reporter = reporter or ProgressReporter(None)
+    scheduler = scheduler or BackoffScheduler()
+    started = time.monotonic()
+    total = request.resumable.size()
+    reporter.emit("start", "Uploading file...", total=total)
+    saved_uri = _resume_session(request, session_path, reporter) if session_path else None
+
+    def result(**fields):
+        return UploadResult(
+            reporter.file, attempts=attempts, elapsed=time.monotonic() - started, **fields
+        )
+
+    def fail(error, error_class=None):
+        reporter.emit("error", error, error=error, error_class=error_class)
+        return result(error=error, error_class=error_class)
+
+    def remember_session():
+        # The session URI is set by the request that opens the session, before
+        # the first chunk is sent: keep it even if that chunk fails
+        nonlocal saved_uri
+        if session_path and request.resumable_uri not in (None, saved_uri):
+            save_session(session_path, request.resumable_uri)
+            saved_uri = request.resumable_uri
+
+    attempts = 0
+    retries = {}  # Consecutive retries per error class
+    while True:
+        await scheduler.wait()
+        if scheduler.quota_exhausted:
+            return fail("Upload quota exhausted", "quota")
+        if deadline and time.monotonic() > deadline:
+            return fail("Deadline exceeded", "deadline")
+
+        attempts += 1
         try:
-            print("Uploading file...")
-            status, response = request.next_chunk()
-            if response is not None:
-                if "id" in response:
-                    print(f"Video id '{response['id']}' was successfully uploaded.")
-                else:
-                    print(f"The upload failed with an unexpected response: {response}")
-                    sys.exit(1)  # Exit with error code
-        except HttpError as e:
-            if e.resp.status in RETRIABLE_STATUS_CODES:
-                error = f"A retriable HTTP error {e.resp.status} occurred:\n{e.content}"
+            status, response = await asyncio.to_thread(request.next_chunk, http=connection)
+        except Exception as e:
+            remember_session()
+            error_class = classify_error(e, resumed=saved_uri is not None)
+            if error_class == "quota":
+                scheduler.quota_exhausted = True
+            if error_class in (None, "quota"):
+                return fail(f"A non-retriable error occurred: {_describe(e)}", error_class)
+            if error_class == "session_expired":
+                # The saved session expired: start a new one
+                session_path.unlink(missing_ok=True)
+                saved_uri = None
+                _restart_session(request)
+
+            policy = scheduler.policies[error_class]
+            retries[error_class] = retries.get(error_class, 0) + 1
+            if retries[error_class] > policy.max_retries:
+                return fail(f"{_describe(e)}. No longer attempting to retry.", error_class)
+            delay = policy.delay(retries[error_class])
+            if deadline and time.monotonic() + delay > deadline:
+                return fail(f"{_describe(e)}. Retrying would exceed the deadline.", "deadline")
+            reporter.emit(
+                "retry",
+                f"A retriable error occurred: {_describe(e)}\nRetrying in {delay:.2f} seconds...",
+                error=_describe(e),
+                error_class=error_class,
+                attempt=retries[error_class],
+                delay=round(delay, 3),
+            )
+            if policy.pause_all:
+                scheduler.pause(delay)
             else:
-                print(
-                    f"An non-retriable HTTP error {e.resp.status} occurred:\n{e.content}"
-                )
-                raise  # Re-raise the error if it's not retriable
-        except tuple(
-            list(RETRIABLE_EXCEPTIONS) + [http.client.HTTPException]
-        ) as e:  # Add base HTTPException
-            error = f"A retriable error occurred: {e}"
-
-        if error is not None:
-            print(error)
-            retry += 1
-            if retry > MAX_RETRIES:
-                print("No longer attempting to retry.")
-                sys.exit(1)  # Exit with error code
-
-            max_sleep = 2**retry
-            sleep_seconds = random.random() * max_sleep
-            print(f"Sleeping {sleep_seconds:.2f} seconds and then retrying...")
-            time.sleep(sleep_seconds)
-            error = None  # Reset error before next retry
+                await asyncio.sleep(delay)
+            continue
+
+        remember_session()
+        if status is not None:
+            reporter.progress(status.resumable_progress, total)
+            retries.clear()  # The server acknowledged more data
+        if response is None:
+            continue
+
+        if session_path:
+            session_path.unlink(missing_ok=True)
+        if "id" not in response:
+            return fail(f"The upload failed with an unexpected response: {response}")
+        reporter.progress(total, total)
+        reporter.emit(
+            "done",
+            f"Video id '{response['id']}' was successfully uploaded.",
+            video_id=response["id"],
+        )
+        return result(video_id=response["id"])
+
+
+def read_manifest(path):
+    """
+    Read an upload manifest.
+
+    Each line is a JSON object with "file" and optionally "id", "title",
+    "description", "category", "keywords" and "privacyStatus". Blank lines
+    are ignored.
+    """
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "file" not in entry:
+                raise ValueError(f"{path}:{line_number}: entries need 'file'")
+            entry.setdefault("id", str(len(entries)))
+            entries.append(entry)
+    return entries
+
+
+async def upload_queue(
+    credentials, entries, defaults, concurrency=DEFAULT_CONCURRENCY, refresh_discovery=False
+):
+    """
+    Upload every manifest entry, at most CONCURRENCY at a time.
+
+    One discovery client and one BackoffScheduler are shared by all uploads.
+    Each running upload borrows an authorized connection from a pool of
+    CONCURRENCY (httplib2 connections are not thread-safe). DEFAULTS (parsed
+    arguments) supply the fields an entry does not set.
+
+    Returns:
+        One result dict per entry, in manifest order
+    """
+    from google_auth_httplib2 import AuthorizedHttp
+    from googleapiclient.http import build_http
+
+    youtube = get_authenticated_service(credentials, refresh_discovery=refresh_discovery)
+    scheduler = BackoffScheduler()
+    connections = asyncio.Queue()
+    for _ in range(concurrency):
+        connections.put_nowait(AuthorizedHttp(credentials, http=build_http()))
+
+    async def upload_entry(entry):
+        options = argparse.Namespace(**{**vars(defaults), **entry})
+        connection = await connections.get()
+        try:
+            upload = await initialize_upload(
+                youtube, options, connection=connection, scheduler=scheduler
+            )
+        except Exception as e:
+            upload = UploadResult(options.file, error=f"{type(e).__name__}: {e}")
+        finally:
+            connections.put_nowait(connection)
+        result = {"id": entry["id"], **upload.to_dict()}
+        ProgressReporter(options.file, json_output=options.progress == "json").emit(
+            "result", None, **result
+        )
+        return result
+
+    return await asyncio.gather(*(upload_entry(entry) for entry in entries))
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Upload video to YouTube.")
-    parser.add_argument("--file", required=True, help="Video file to upload")
+    parser.add_argument("--file", help="Video file to upload")
+    parser.add_argument(
+        "--manifest",
+        help="JSON lines file of videos to upload concurrently (see read_manifest). Other options are defaults for its entries.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help="Uploads running at the same time with --manifest.",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        default=None,
+        help="Give up on an upload after this many seconds, retries included.",
+    )
+    parser.add_argument(
+        "--refresh-discovery",
+        action="store_true",
+        help="Download the current YouTube API discovery document instead of the cached one.",
+    )
     parser.add_argument("--title", help="Video title", default="Test Title")
     parser.add_argument(
         "--description", help="Video description", default="Test Description"
@@ -196,9 +640,30 @@ if __name__ == "__main__":
         default=VALID_PRIVACY_STATUSES[0],  # Default to public
         help="Video privacy status.",
     )
+    parser.add_argument(
+        "--chunk-size",
+        type=float,
+        default=DEFAULT_CHUNK_SIZE_MB,
+        help="Upload chunk size in MB (rounded to a multiple of 256 KiB).",
+    )
+    parser.add_argument(
+        "--progress",
+        choices=("text", "json"),
+        default="text",
+        help="Progress output: human-readable text or one JSON event per line.",
+    )
+    parser.add_argument(
+        "--no-resume",
+        dest="resume",
+        action="store_false",
+        help="Do not resume an interrupted upload of the same file.",
+    )
     args = parser.parse_args()
 
-    if not os.path.exists(args.file):
+    if not args.file and not args.manifest:
+        parser.error("one of --file or --manifest is required")
+
+    if args.file and not os.path.exists(args.file):
         print(
             f"Error: Please specify a valid file using the --file parameter. File not found: {args.file}"
         )
@@ -215,12 +680,28 @@ if __name__ == "__main__":
         )
         sys.exit(1)
 
-    youtube = get_authenticated_service()
+    if args.manifest:
+        entries = read_manifest(args.manifest)
+        results = asyncio.run(
+            upload_queue(
+                get_credentials(),
+                entries,
+                args,
+                concurrency=max(args.concurrency, 1),
+                refresh_discovery=args.refresh_discovery,
+            )
+        )
+        failed = [r for r in results if not r["ok"]]
+        if args.progress != "json":
+            print(f"Uploaded {len(results) - len(failed)} of {len(results)} videos.")
+            for result in failed:
+                print(f"  {result['file']}: {result['error']}")
+        sys.exit(1 if failed else 0)
+
+    youtube = get_authenticated_service(refresh_discovery=args.refresh_discovery)
     try:
-        initialize_upload(youtube, args)
-    except HttpError as e:
-        print(f"An HTTP error {e.resp.status} occurred:\n{e.content}")
-        sys.exit(1)
+        result = asyncio.run(initialize_upload(youtube, args))
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
         sys.exit(1)
+    sys.exit(0 if result.ok else 1)
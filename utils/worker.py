@@ -0,0 +1,140 @@
+"""
+Long-lived worker mode for utils/main.py.
+
+Instead of spawning a fresh ``python3 utils/main.py`` for every job, callers can
+start ``main.py serve`` once and send it JSON-lines requests. The heavy imports
+(moviepy, kokoro, faster_whisper, torch) and the loaded models stay resident
+between requests.
+
+Request format (one JSON object per line):
+    {"id": "job-1", "command": "audio", "args": ["Hello", "-o", "out.mp3"]}
+
+Response format (one JSON object per line):
+    {"id": "job-1", "ok": true, "error": null, "output": "...", "elapsed": 1.23}
+
+Whatever the command writes to stdout (a transcript, ``audio --batch`` result
+lines) is returned as "output"; what it writes to stderr goes to the worker's
+stderr. Neither interleaves with the response stream.
+"""
+
+import io
+import json
+import os
+import socketserver
+import sys
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+import click
+
+# Commands that may be executed through the worker protocol
+WORKER_COMMANDS = ("audio", "editor", "transcribe")
+
+
+def handle_request(group: click.Group, line: str) -> dict:
+    """
+    Execute a single JSON-lines request against the click command GROUP.
+
+    Args:
+        group: The click group holding the worker commands
+        line: Raw request line
+
+    Returns:
+        The response dictionary to send back to the caller
+    """
+    try:
+        request = json.loads(line)
+    except json.JSONDecodeError as e:
+        return {"id": None, "ok": False, "error": f"Invalid request: {e}"}
+
+    if not isinstance(request, dict):
+        return {"id": None, "ok": False, "error": "Request must be a JSON object"}
+
+    request_id = request.get("id")
+    command_name = request.get("command")
+    args = request.get("args", [])
+
+    if command_name not in WORKER_COMMANDS:
+        return {
+            "id": request_id,
+            "ok": False,
+            "error": f"Unsupported command: {command_name}",
+        }
+    if not isinstance(args, list):
+        return {"id": request_id, "ok": False, "error": "'args' must be a list"}
+
+    command = group.commands[command_name]
+    started = time.perf_counter()
+    error = None
+    output = io.StringIO()
+
+    # Keep command output away from the response stream
+    with redirect_stdout(output):
+        try:
+            # Without standalone mode, ctx.exit(code) returns the code
+            exit_code = command.main(
+                args=[str(arg) for arg in args],
+                prog_name=command_name,
+                standalone_mode=False,
+            )
+            if isinstance(exit_code, int) and exit_code != 0:
+                error = f"Exited with status {exit_code}"
+        except click.ClickException as e:
+            error = e.format_message()
+        except click.exceptions.Abort:
+            error = "Aborted"
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                error = f"Exited with status {e.code}"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+
+    return {
+        "id": request_id,
+        "ok": error is None,
+        "error": error,
+        "output": output.getvalue(),
+        "elapsed": round(time.perf_counter() - started, 3),
+    }
+
+
+def serve_stdio(group: click.Group):
+    """Serve requests read from stdin, writing responses to stdout."""
+    responses = sys.stdout
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        response = handle_request(group, line)
+        responses.write(json.dumps(response) + "\n")
+        responses.flush()
+
+
+def serve_socket(group: click.Group, socket_path: Path):
+    """
+    Serve requests on a Unix domain socket at SOCKET_PATH.
+
+    Connections are handled one at a time: the resident models are not
+    thread-safe, and callers queue naturally on the socket backlog.
+    """
+
+    class RequestHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for raw in self.rfile:
+                line = raw.decode("utf-8")
+                if not line.strip():
+                    continue
+                response = handle_request(group, line)
+                self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+                self.wfile.flush()
+
+    # Remove a stale socket left behind by a previous worker
+    if socket_path.exists():
+        socket_path.unlink()
+
+    with socketserver.UnixStreamServer(socket_path.as_posix(), RequestHandler) as server:
+        try:
+            server.serve_forever()
+        finally:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)